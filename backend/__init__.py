@@ -1 +1 @@
-# AI Social Media Agent - Backend package
+# AI Social Media Agent - Backend package
@@ -1,232 +1,420 @@
-"""
-Main application file for AI Social Media Agent
-This orchestrates all the components and handles the main workflow
-"""
-
-import os
-from dotenv import load_dotenv
-from .brand_analyzer import BrandAnalyzer
-from .post_generator import PostGenerator
-from .feedback_loop import FeedbackLoop
-from .image_generator import ImageGenerator
-import json
-from datetime import datetime
-
-# Load environment variables from .env file
-load_dotenv()
-
-class SocialMediaAgent:
-    """
-    Main class that coordinates all components of the social media agent
-    """
-    
-    def __init__(self):
-        """Initialize all components with API keys from environment"""
-        # Get API key from environment variables
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        
-        # Initialize all modules (all now use OpenAI)
-        self.brand_analyzer = BrandAnalyzer(self.openai_api_key)
-        self.post_generator = PostGenerator(self.openai_api_key)
-        self.feedback_loop = FeedbackLoop(self.openai_api_key)
-        self.image_generator = ImageGenerator(self.openai_api_key)
-        
-        # Store brand profile after analysis
-        self.brand_profile = None
-        
-    def analyze_brand(self, website_url=None, existing_posts=None, brand_guidelines=None):
-        """
-        Analyze brand materials to extract brand voice and visual identity
-        
-        Args:
-            website_url (str): URL of company website
-            existing_posts (list): List of existing social media posts
-            brand_guidelines (dict): Optional brand guidelines
-            
-        Returns:
-            dict: Brand profile with voice, colors, tone, etc.
-        """
-        print("🔍 Analyzing brand identity...")
-        
-        # Use the brand analyzer to extract brand characteristics
-        self.brand_profile = self.brand_analyzer.analyze(
-            website_url=website_url,
-            existing_posts=existing_posts,
-            brand_guidelines=brand_guidelines
-        )
-        
-        print("✅ Brand analysis complete!")
-        return self.brand_profile
-    
-    def generate_post(self, intent, platform="linkedin", constraints=None, rag_elements=None):
-        """
-        Generate a social media post with multiple variations
-        
-        Args:
-            intent (str): What the post is about (e.g., "Announce hackathon")
-            platform (str): "linkedin" or "instagram"
-            constraints (dict): Optional constraints (date, tone, CTA)
-            rag_elements (dict): Optional elements like speaker names, images
-            
-        Returns:
-            dict: Post variations with captions and images
-        """
-        if not self.brand_profile:
-            raise ValueError("Brand profile not set. Run analyze_brand() first!")
-        
-        print(f"📝 Generating {platform} post for: {intent}")
-        
-        # Step 1: Generate initial post variations (3 versions)
-        initial_posts = self.post_generator.generate_variations(
-            brand_profile=self.brand_profile,
-            intent=intent,
-            platform=platform,
-            constraints=constraints,
-            rag_elements=rag_elements,
-            num_variations=3
-        )
-        
-        # Step 2: Run feedback loop on each variation
-        improved_posts = []
-        for idx, post in enumerate(initial_posts):
-            print(f"🔄 Running feedback loop on variation {idx + 1}...")
-            
-            # AI critiques and improves the post 2-3 times
-            improved_post = self.feedback_loop.iterate(
-                post=post,
-                brand_profile=self.brand_profile,
-                platform=platform,
-                iterations=2
-            )
-            improved_posts.append(improved_post)
-        
-        # Step 3: Generate images for each improved post
-        final_posts = []
-        for idx, post in enumerate(improved_posts):
-            print(f"🎨 Generating image for variation {idx + 1}...")
-            
-            # Generate background image
-            image_path = self.image_generator.generate_background(
-                post_data=post,
-                brand_profile=self.brand_profile,
-                platform=platform
-            )
-            
-            # Add text overlay to image
-            final_image_path = self.image_generator.add_text_overlay(
-                image_path=image_path,
-                text=post.get('overlay_text', ''),
-                brand_profile=self.brand_profile
-            )
-            
-            post['image_path'] = final_image_path
-            final_posts.append(post)
-        
-        print("✅ Post generation complete!")
-        return final_posts
-    
-    def refine_post(self, post_data, user_feedback):
-        """
-        Refine a selected post based on user feedback
-        
-        Args:
-            post_data (dict): The post to refine
-            user_feedback (str): User's feedback/requests
-            
-        Returns:
-            dict: Refined post
-        """
-        print("🔧 Refining post based on your feedback...")
-        
-        # Generate refined version
-        refined_post = self.post_generator.refine_with_feedback(
-            post_data=post_data,
-            user_feedback=user_feedback,
-            brand_profile=self.brand_profile
-        )
-        
-        # Regenerate image if needed
-        if refined_post.get('caption') != post_data.get('caption'):
-            print("🎨 Regenerating image...")
-            image_path = self.image_generator.generate_background(
-                post_data=refined_post,
-                brand_profile=self.brand_profile,
-                platform=post_data.get('platform', 'linkedin')
-            )
-            
-            final_image_path = self.image_generator.add_text_overlay(
-                image_path=image_path,
-                text=refined_post.get('overlay_text', ''),
-                brand_profile=self.brand_profile
-            )
-            
-            refined_post['image_path'] = final_image_path
-        
-        print("✅ Post refinement complete!")
-        return refined_post
-    
-    def save_post(self, post_data, output_dir="data/generated_posts"):
-        """
-        Save generated post to disk
-        
-        Args:
-            post_data (dict): Post to save
-            output_dir (str): Directory to save to
-            
-        Returns:
-            str: Path to saved files
-        """
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"post_{timestamp}"
-        
-        # Save caption as text file
-        caption_path = os.path.join(output_dir, f"{base_filename}_caption.txt")
-        with open(caption_path, 'w', encoding='utf-8') as f:
-            f.write(post_data['caption'])
-        
-        # Save metadata as JSON
-        metadata_path = os.path.join(output_dir, f"{base_filename}_metadata.json")
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'platform': post_data.get('platform'),
-                'intent': post_data.get('intent'),
-                'timestamp': timestamp,
-                'caption': post_data['caption'],
-                'overlay_text': post_data.get('overlay_text', '')
-            }, f, indent=2)
-        
-        print(f"💾 Post saved to {output_dir}")
-        return output_dir
-
-
-# Example usage (can be run directly for testing)
-if __name__ == "__main__":
-    # Initialize the agent
-    agent = SocialMediaAgent()
-    
-    # Example: Analyze a brand
-    brand_profile = agent.analyze_brand(
-        website_url="https://example.com",
-        existing_posts=[
-            "Excited to announce our new AI hackathon! 🚀",
-            "Join us for the biggest tech event of the year."
-        ]
-    )
-    
-    print("\nBrand Profile:", json.dumps(brand_profile, indent=2))
-    
-    # Example: Generate a post
-    posts = agent.generate_post(
-        intent="Announce AI hackathon with Super Bowl theme",
-        platform="linkedin",
-        constraints={
-            'tone': 'exciting',
-            'cta': 'Register now'
-        }
-    )
-    
+"""
+Main application file for AI Social Media Agent
+This orchestrates all the components and handles the main workflow
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import aiofiles
+import httpx
+import openai
+from dotenv import load_dotenv
+from .brand_analyzer import BrandAnalyzer
+from .post_generator import PostGenerator
+from .feedback_loop import FeedbackLoop
+from .image_generator import ImageGenerator
+import json
+from datetime import datetime
+
+# Load environment variables from .env file
+load_dotenv()
+
+class SocialMediaAgent:
+    """
+    Main class that coordinates all components of the social media agent
+    """
+    
+    def __init__(self, client=None, async_client=None):
+        """
+        Initialize all components with API keys from environment
+
+        Args:
+            client (openai.OpenAI): Optional pre-built sync client; hosts
+                like Streamlit can keep one behind st.cache_resource so the
+                pool survives across agent rebuilds
+            async_client (openai.AsyncOpenAI): Optional pre-built async
+                client. Must be fresh (never used on another event loop) -
+                it will be driven exclusively by this agent's own loop
+        """
+        # Get API key from environment variables
+        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        
+        # One sync and one async OpenAI client shared across all modules:
+        # each openai client owns its own httpx connection pool, so separate
+        # clients per module meant four pools to api.openai.com that never
+        # shared a keep-alive socket
+        limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        self._client = client or openai.OpenAI(
+            api_key=self.openai_api_key,
+            http_client=httpx.Client(limits=limits)
+        )
+        self._async_client = async_client or openai.AsyncOpenAI(
+            api_key=self.openai_api_key,
+            http_client=httpx.AsyncClient(limits=limits)
+        )
+
+        # One persistent event loop for all async work, running on its own
+        # thread. httpx binds keep-alive connections to the loop they were
+        # opened on; running each step in its own asyncio.run() loop left
+        # the shared async client's pooled connections attached to a closed
+        # loop, and the next step failed with "Event loop is closed"
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever,
+                         name="agent-event-loop", daemon=True).start()
+
+        # Initialize all modules (all now use OpenAI)
+        self.brand_analyzer = BrandAnalyzer(client=self._client,
+                                            async_client=self._async_client)
+        self.post_generator = PostGenerator(async_client=self._async_client)
+        self.feedback_loop = FeedbackLoop(async_client=self._async_client)
+        self.image_generator = ImageGenerator(client=self._client,
+                                              async_client=self._async_client)
+        
+        # Store brand profile after analysis
+        self.brand_profile = None
+
+    def _run_async(self, coro):
+        """
+        Run a coroutine to completion on the agent's event loop
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Whatever the coroutine returns
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
+    def analyze_brand(self, website_url=None, existing_posts=None, brand_guidelines=None):
+        """
+        Analyze brand materials to extract brand voice and visual identity
+        
+        Args:
+            website_url (str): URL of company website
+            existing_posts (list): List of existing social media posts
+            brand_guidelines (dict): Optional brand guidelines
+            
+        Returns:
+            dict: Brand profile with voice, colors, tone, etc.
+        """
+        print("🔍 Analyzing brand identity...")
+        
+        # Use the brand analyzer to extract brand characteristics
+        self.brand_profile = self.brand_analyzer.analyze(
+            website_url=website_url,
+            existing_posts=existing_posts,
+            brand_guidelines=brand_guidelines
+        )
+        
+        print("✅ Brand analysis complete!")
+        return self.brand_profile
+    
+    def generate_post(self, intent, platform="linkedin", constraints=None, rag_elements=None,
+                      economy_mode=False, on_variation=None, brand_profile=None):
+        """
+        Generate a social media post with multiple variations
+
+        Args:
+            intent (str): What the post is about (e.g., "Announce hackathon")
+            platform (str): "linkedin" or "instagram"
+            constraints (dict): Optional constraints (date, tone, CTA)
+            rag_elements (dict): Optional elements like speaker names, images
+            economy_mode (bool): Render backgrounds with DALL-E 2 (a fraction
+                of the DALL-E 3 cost, square and lower fidelity) - for drafts
+                and bulk runs where image cost dominates
+            on_variation (callable): Optional (index, post) callback fired
+                from the caller's thread as each variation finishes
+                rendering, so UIs can show results as they complete instead
+                of waiting for the slowest one
+            brand_profile (dict): Brand profile to generate against. Hosts
+                that share one agent across sessions must pass it here -
+                the self.brand_profile fallback is mutable shared state and
+                another session can overwrite it mid-generation
+
+        Returns:
+            dict: Post variations with captions and images
+        """
+        # Snapshot the profile for the whole run; every step below reads
+        # this local, never self.brand_profile, so a concurrent analyze
+        # can't swap brands between the feedback waves and the images
+        brand_profile = brand_profile if brand_profile is not None else self.brand_profile
+        if not brand_profile:
+            raise ValueError("Brand profile not set. Run analyze_brand() first!")
+        
+        print(f"📝 Generating {platform} post for: {intent}")
+        
+        # Step 1: Generate initial post variations (3 versions)
+        initial_posts = self._run_async(self.post_generator.generate_variations(
+            brand_profile=brand_profile,
+            intent=intent,
+            platform=platform,
+            constraints=constraints,
+            rag_elements=rag_elements,
+            num_variations=3
+        ))
+        
+        # Step 2: Run feedback loop on each variation
+        # Iterations within a variation are sequential, but the same iteration
+        # across variations is independent - so run the loop as wavefronts:
+        # every variation's iteration 1 concurrently, then iteration 2.
+        # Variations that already score well drop out between waves.
+        print(f"🔄 Running feedback loops on {len(initial_posts)} variations concurrently...")
+
+        # Shared by the feedback and image steps so backgrounds pre-started
+        # from streamed descriptions land in the same queue (FIFO order
+        # guarantees they get workers before the render tasks that await them)
+        executor = ThreadPoolExecutor(max_workers=3)
+
+        # Image cost dominates per-post cost; economy mode trades fidelity
+        # for a much cheaper DALL-E 2 render
+        image_model = "dall-e-2" if economy_mode else "dall-e-3"
+
+        # variation index -> (image_description, in-flight background Future)
+        early_backgrounds = {}
+
+        def _start_background_early(idx, description):
+            early_backgrounds[idx] = (description, executor.submit(
+                self.image_generator.generate_background,
+                post_data={'image_description': description},
+                brand_profile=brand_profile,
+                platform=platform,
+                model=image_model
+            ))
+
+        async def _run_feedback_loops(iterations=2):
+            posts = list(initial_posts)
+            active = list(range(len(posts)))
+
+            for wave in range(iterations):
+                print(f"🔄 Feedback wave {wave + 1}/{iterations} ({len(active)} variations)")
+
+                # On the final wave the improved posts are what ships, so the
+                # response streams and each variation's DALL-E call starts as
+                # soon as its image_description has finished arriving
+                wave_active = list(active)
+                on_description = None
+                if wave == iterations - 1:
+                    on_description = lambda i, desc: _start_background_early(wave_active[i], desc)
+
+                stepped = await self.feedback_loop.step(
+                    [posts[idx] for idx in active],
+                    brand_profile=brand_profile,
+                    platform=platform,
+                    on_image_description=on_description
+                )
+                for idx, new_post in zip(active, stepped):
+                    posts[idx] = new_post
+
+                active = [idx for idx in active if not self.feedback_loop.is_good_enough(posts[idx])]
+                if not active:
+                    break
+
+            return posts
+
+        improved_posts = self._run_async(_run_feedback_loops())
+        
+        # Step 3: Generate images for each improved post
+        # Each DALL-E call is a multi-second network round trip; rendering the
+        # variations in parallel collapses wall time to one image generation
+        print(f"🎨 Generating images for {len(improved_posts)} variations concurrently...")
+
+        def _render(idx_and_post):
+            idx, post = idx_and_post
+
+            # Reuse a background already started from the streamed
+            # image_description, as long as the description didn't change
+            early = early_backgrounds.get(idx)
+            if early and early[0] == post.get('image_description'):
+                image_path = early[1].result()
+            else:
+                image_path = self.image_generator.generate_background(
+                    post_data=post,
+                    brand_profile=brand_profile,
+                    platform=platform,
+                    model=image_model
+                )
+
+            # Add text overlay to image
+            return self.image_generator.add_text_overlay(
+                image_path=image_path,
+                text=post.get('overlay_text', ''),
+                brand_profile=brand_profile
+            )
+
+        try:
+            futures = {
+                executor.submit(_render, (idx, post)): idx
+                for idx, post in enumerate(improved_posts)
+            }
+            # Completion order, not submission order: each variation becomes
+            # visible to the caller as soon as its own render lands
+            for future in as_completed(futures):
+                idx = futures[future]
+                improved_posts[idx]['image_path'] = future.result()
+                if on_variation:
+                    on_variation(idx, improved_posts[idx])
+        finally:
+            executor.shutdown()
+
+        final_posts = improved_posts
+        
+        print("✅ Post generation complete!")
+        return final_posts
+    
+    def refine_post(self, post_data, user_feedback, brand_profile=None):
+        """
+        Refine a selected post based on user feedback
+
+        Args:
+            post_data (dict): The post to refine
+            user_feedback (str): User's feedback/requests
+            brand_profile (dict): Brand profile to refine against; like
+                generate_post, multi-session hosts must pass it explicitly
+                rather than rely on the shared self.brand_profile
+
+        Returns:
+            dict: Refined post
+        """
+        brand_profile = brand_profile if brand_profile is not None else self.brand_profile
+        print("🔧 Refining post based on your feedback...")
+        
+        # Generate refined version
+        refined_post = self._run_async(self.post_generator.refine_with_feedback(
+            post_data=post_data,
+            user_feedback=user_feedback,
+            brand_profile=brand_profile
+        ))
+        
+        # Regenerate image if needed
+        if refined_post.get('caption') != post_data.get('caption'):
+            print("🎨 Regenerating image...")
+            image_path = self.image_generator.generate_background(
+                post_data=refined_post,
+                brand_profile=brand_profile,
+                platform=post_data.get('platform', 'linkedin')
+            )
+            
+            final_image_path = self.image_generator.add_text_overlay(
+                image_path=image_path,
+                text=refined_post.get('overlay_text', ''),
+                brand_profile=brand_profile
+            )
+            
+            refined_post['image_path'] = final_image_path
+        
+        print("✅ Post refinement complete!")
+        return refined_post
+    
+    def save_post(self, post_data, output_dir="data/generated_posts"):
+        """
+        Save generated post to disk
+        
+        Args:
+            post_data (dict): Post to save
+            output_dir (str): Directory to save to
+            
+        Returns:
+            str: Path to saved files
+        """
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Generate filename with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_filename = f"post_{timestamp}"
+        
+        # Save caption as text file
+        caption_path = os.path.join(output_dir, f"{base_filename}_caption.txt")
+        with open(caption_path, 'w', encoding='utf-8', buffering=65536) as f:
+            f.write(post_data['caption'])
+
+        # Save metadata as JSON - serialize compactly in one shot and write
+        # once, instead of json.dump pretty-printing through many small writes
+        metadata_path = os.path.join(output_dir, f"{base_filename}_metadata.json")
+        metadata_json = json.dumps({
+            'platform': post_data.get('platform'),
+            'intent': post_data.get('intent'),
+            'timestamp': timestamp,
+            'caption': post_data['caption'],
+            'overlay_text': post_data.get('overlay_text', '')
+        }, separators=(',', ':'))
+        with open(metadata_path, 'w', encoding='utf-8', buffering=65536) as f:
+            f.write(metadata_json)
+        
+        print(f"💾 Post saved to {output_dir}")
+        return output_dir
+
+    async def save_posts(self, posts, output_dir="data/generated_posts"):
+        """
+        Save many generated posts with overlapping disk I/O
+
+        For batch experiments that persist hundreds of posts, aiofiles +
+        asyncio.gather overlaps the writes instead of blocking on each
+        open/write pair in turn. Single posts can keep using save_post().
+
+        Args:
+            posts (list): Posts to save
+            output_dir (str): Directory to save to
+
+        Returns:
+            str: Path to saved files
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        # One timestamp per batch; the sequence number keeps names unique
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        async def _save_one(seq, post_data):
+            base_filename = f"post_{timestamp}_{seq}"
+
+            caption_path = os.path.join(output_dir, f"{base_filename}_caption.txt")
+            async with aiofiles.open(caption_path, 'w', encoding='utf-8') as f:
+                await f.write(post_data['caption'])
+
+            metadata_path = os.path.join(output_dir, f"{base_filename}_metadata.json")
+            metadata_json = json.dumps({
+                'platform': post_data.get('platform'),
+                'intent': post_data.get('intent'),
+                'timestamp': timestamp,
+                'caption': post_data['caption'],
+                'overlay_text': post_data.get('overlay_text', '')
+            }, separators=(',', ':'))
+            async with aiofiles.open(metadata_path, 'w', encoding='utf-8') as f:
+                await f.write(metadata_json)
+
+        await asyncio.gather(*[_save_one(seq, post) for seq, post in enumerate(posts)])
+
+        print(f"💾 {len(posts)} posts saved to {output_dir}")
+        return output_dir
+
+
+# Example usage (can be run directly for testing)
+if __name__ == "__main__":
+    # Initialize the agent
+    agent = SocialMediaAgent()
+    
+    # Example: Analyze a brand
+    brand_profile = agent.analyze_brand(
+        website_url="https://example.com",
+        existing_posts=[
+            "Excited to announce our new AI hackathon! 🚀",
+            "Join us for the biggest tech event of the year."
+        ]
+    )
+    
+    print("\nBrand Profile:", json.dumps(brand_profile, indent=2))
+    
+    # Example: Generate a post
+    posts = agent.generate_post(
+        intent="Announce AI hackathon with Super Bowl theme",
+        platform="linkedin",
+        constraints={
+            'tone': 'exciting',
+            'cta': 'Register now'
+        }
+    )
+    
     print(f"\nGenerated {len(posts)} post variations!")
\ No newline at end of file
@@ -1,219 +1,360 @@
-"""
-Brand Analyzer Module
-Analyzes company brand materials to extract voice, tone, colors, and messaging patterns
-Uses OpenAI GPT-4 instead of Claude
-"""
-
-import openai
-import requests
-from bs4 import BeautifulSoup
-import json
-import re
-
-
-class BrandAnalyzer:
-    """
-    Analyzes brand materials to create a comprehensive brand profile
-    """
-    
-    def __init__(self, openai_api_key):
-        """
-        Initialize the brand analyzer with OpenAI API
-        
-        Args:
-            openai_api_key (str): API key for OpenAI
-        """
-        self.client = openai.OpenAI(api_key=openai_api_key)
-        
-    def scrape_website(self, url):
-        """
-        Scrape website content for brand analysis
-        
-        Args:
-            url (str): Website URL to scrape
-            
-        Returns:
-            str: Extracted text content from website
-        """
-        try:
-            print(f"🌐 Scraping website: {url}")
-            
-            # Set a user agent to avoid being blocked
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text(separator=' ', strip=True)
-            
-            # Clean up whitespace
-            text = re.sub(r'\s+', ' ', text)
-            
-            # Limit to first 5000 characters to avoid token limits
-            return text[:5000]
-            
-        except Exception as e:
-            print(f"⚠️ Warning: Could not scrape website: {e}")
-            return ""
-    
-    def analyze(self, website_url=None, existing_posts=None, brand_guidelines=None):
-        """
-        Main analysis method to create brand profile
-        
-        Args:
-            website_url (str): Company website URL
-            existing_posts (list): List of existing social media posts
-            brand_guidelines (dict): Optional brand guidelines
-            
-        Returns:
-            dict: Comprehensive brand profile
-        """
-        # Gather all brand materials
-        website_content = ""
-        if website_url:
-            website_content = self.scrape_website(website_url)
-        
-        posts_text = ""
-        if existing_posts:
-            posts_text = "\n\n".join(existing_posts)
-        
-        guidelines_text = ""
-        if brand_guidelines:
-            guidelines_text = json.dumps(brand_guidelines, indent=2)
-        
-        # Create analysis prompt for GPT-4
-        analysis_prompt = f"""
-You are a brand strategist analyzing company materials to extract brand characteristics.
-
-Analyze the following materials and create a comprehensive brand profile:
-
-WEBSITE CONTENT:
-{website_content if website_content else "Not provided"}
-
-EXISTING SOCIAL MEDIA POSTS:
-{posts_text if posts_text else "Not provided"}
-
-BRAND GUIDELINES:
-{guidelines_text if guidelines_text else "Not provided"}
-
-Extract and return the following in JSON format:
-
-{{
-    "brand_voice": {{
-        "tone": "formal/casual/playful/professional/inspirational",
-        "personality_traits": ["trait1", "trait2", "trait3"],
-        "emoji_usage": "none/minimal/moderate/frequent",
-        "sentence_style": "short and punchy/medium/long and detailed",
-        "language_complexity": "simple/moderate/sophisticated"
-    }},
-    "visual_identity": {{
-        "primary_colors": ["#hexcolor1", "#hexcolor2"],
-        "design_style": "minimal/bold/corporate/creative/tech-focused",
-        "imagery_style": "abstract/photographic/illustrated/mixed"
-    }},
-    "messaging_patterns": {{
-        "key_themes": ["theme1", "theme2", "theme3"],
-        "value_propositions": ["value1", "value2"],
-        "target_audience": "description of target audience",
-        "common_topics": ["topic1", "topic2", "topic3"]
-    }},
-    "cta_style": {{
-        "typical_ctas": ["CTA1", "CTA2", "CTA3"],
-        "cta_placement": "beginning/middle/end",
-        "cta_tone": "urgent/casual/professional/friendly"
-    }},
-    "content_structure": {{
-        "typical_post_length": "short/medium/long",
-        "uses_hashtags": true/false,
-        "hashtag_count": "number or range",
-        "uses_questions": true/false,
-        "uses_statistics": true/false
-    }}
-}}
-
-Be specific and evidence-based. If information is not available, make reasonable inferences based on industry standards.
-Return ONLY the JSON, no other text.
-"""
-        
-        try:
-            print("🤖 Analyzing brand with GPT-4...")
-            
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",  # or "gpt-4" if you have access
-                messages=[
-                    {"role": "system", "content": "You are a brand analysis expert. Always respond with valid JSON only."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            # Extract the response
-            response_text = response.choices[0].message.content
-            
-            # Parse JSON from response
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                brand_profile = json.loads(json_match.group(1))
-            else:
-                # Try to parse directly
-                brand_profile = json.loads(response_text)
-            
-            print("✅ Brand analysis complete!")
-            return brand_profile
-            
-        except Exception as e:
-            print(f"❌ Error during brand analysis: {e}")
-            # Return a default brand profile if analysis fails
-            return self._default_brand_profile()
-    
-    def _default_brand_profile(self):
-        """
-        Return a default brand profile as fallback
-        
-        Returns:
-            dict: Default brand profile
-        """
-        return {
-            "brand_voice": {
-                "tone": "professional",
-                "personality_traits": ["innovative", "reliable", "forward-thinking"],
-                "emoji_usage": "moderate",
-                "sentence_style": "medium",
-                "language_complexity": "moderate"
-            },
-            "visual_identity": {
-                "primary_colors": ["#1a73e8", "#34a853"],
-                "design_style": "modern",
-                "imagery_style": "photographic"
-            },
-            "messaging_patterns": {
-                "key_themes": ["innovation", "technology", "growth"],
-                "value_propositions": ["cutting-edge solutions", "reliable service"],
-                "target_audience": "tech-savvy professionals",
-                "common_topics": ["AI", "technology", "business"]
-            },
-            "cta_style": {
-                "typical_ctas": ["Learn more", "Get started", "Join us"],
-                "cta_placement": "end",
-                "cta_tone": "professional"
-            },
-            "content_structure": {
-                "typical_post_length": "medium",
-                "uses_hashtags": True,
-                "hashtag_count": "3-5",
-                "uses_questions": True,
-                "uses_statistics": False
-            }
+"""
+Brand Analyzer Module
+Analyzes company brand materials to extract voice, tone, colors, and messaging patterns
+Uses OpenAI GPT-4 instead of Claude
+"""
+
+import asyncio
+import hashlib
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+import json
+import re
+
+from diskcache import Cache
+
+from .llm_cache import cached_chat
+
+# Scraped-page cache: stores (etag, last_modified, cleaned_text) per URL so
+# unchanged pages revalidate with a cheap conditional GET instead of a full
+# download + parse
+_SCRAPE_CACHE = Cache("data/.scrape_cache")
+
+# Compiled once so the scrape hot path skips per-call pattern lookup
+_WS_RE = re.compile(r'\s+')
+
+# Shared session so repeated scrapes reuse pooled connections instead of
+# paying a fresh TCP/TLS handshake per call
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+)
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+
+
+class BrandAnalyzer:
+    """
+    Analyzes brand materials to create a comprehensive brand profile
+    """
+    
+    def __init__(self, openai_api_key=None, client=None, async_client=None):
+        """
+        Initialize the brand analyzer with OpenAI API
+
+        Args:
+            openai_api_key (str): API key for OpenAI
+            client (openai.OpenAI): Optional shared client, so callers using
+                several components reuse one connection pool
+            async_client (openai.AsyncOpenAI): Optional shared async client
+        """
+        self.client = client or openai.OpenAI(api_key=openai_api_key)
+        # Async client for the batch analyze_many path
+        self.async_client = async_client or openai.AsyncOpenAI(api_key=openai_api_key)
+        
+    def scrape_website(self, url):
+        """
+        Scrape website content for brand analysis
+        
+        Args:
+            url (str): Website URL to scrape
+            
+        Returns:
+            str: Extracted text content from website
+        """
+        try:
+            print(f"🌐 Scraping website: {url}")
+
+            cache_key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+            cached = _SCRAPE_CACHE.get(cache_key)
+
+            # Revalidate cached content instead of unconditionally refetching
+            headers = {}
+            if cached:
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            # The session carries the user agent and reuses connections.
+            # Stream the body and stop after 64KB - we only keep 5000 chars of
+            # text, so downloading and parsing whole large pages is wasted work
+            response = _SESSION.get(url, timeout=10, stream=True, headers=headers)
+
+            if cached and response.status_code == 304:
+                # Page unchanged - no body transfer, no parse
+                response.close()
+                return cached['text']
+
+            response.raise_for_status()
+            raw = response.raw.read(65536, decode_content=True)
+            response.close()
+
+            text = self._clean_html(raw)
+
+            _SCRAPE_CACHE.set(cache_key, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'text': text
+            })
+
+            return text
+
+        except Exception as e:
+            print(f"⚠️ Warning: Could not scrape website: {e}")
+            return ""
+
+    @staticmethod
+    def _clean_html(raw):
+        """
+        Extract cleaned text from raw HTML bytes
+
+        Args:
+            raw (bytes): Raw HTML content
+
+        Returns:
+            str: Cleaned text, capped at 5000 characters
+        """
+        # Parse HTML with lxml (C backend, much faster than html.parser);
+        # passing bytes lets lxml handle the decode in C as well
+        soup = BeautifulSoup(raw, 'lxml')
+
+        # Remove script and style elements
+        for script in soup(["script", "style", "nav", "footer"]):
+            script.decompose()
+
+        # Get text content
+        text = soup.get_text(separator=' ', strip=True)
+
+        # Clean up whitespace
+        text = _WS_RE.sub(' ', text)
+
+        # Limit to first 5000 characters to avoid token limits
+        return text[:5000]
+    
+    def analyze(self, website_url=None, existing_posts=None, brand_guidelines=None):
+        """
+        Main analysis method to create brand profile
+        
+        Args:
+            website_url (str): Company website URL
+            existing_posts (list): List of existing social media posts
+            brand_guidelines (dict): Optional brand guidelines
+            
+        Returns:
+            dict: Comprehensive brand profile
+        """
+        # Gather all brand materials
+        website_content = ""
+        if website_url:
+            website_content = self.scrape_website(website_url)
+        
+        posts_text = ""
+        if existing_posts:
+            posts_text = "\n\n".join(existing_posts)
+        
+        guidelines_text = ""
+        if brand_guidelines:
+            guidelines_text = json.dumps(brand_guidelines, indent=2)
+        
+        # Create analysis prompt for GPT-4
+        analysis_prompt = self._build_analysis_prompt(website_content, posts_text, guidelines_text)
+
+        try:
+            print("🤖 Analyzing brand with GPT-4...")
+
+            # Call OpenAI API (cached on disk - re-analyzing the same brand
+            # materials returns instantly instead of re-paying the round trip)
+            response_text = cached_chat(
+                self.client,
+                model="gpt-4-turbo-preview",  # or "gpt-4" if you have access
+                messages=[
+                    {"role": "system", "content": "You are a brand analysis expert. Always respond with valid JSON only."},
+                    {"role": "user", "content": analysis_prompt}
+                ],
+                temperature=0.7,
+                max_tokens=2000,
+                response_format={"type": "json_object"}
+            )
+
+            # JSON mode guarantees a bare JSON body - no fence stripping needed
+            brand_profile = json.loads(response_text)
+
+            print("✅ Brand analysis complete!")
+            return brand_profile
+
+        except Exception as e:
+            print(f"❌ Error during brand analysis: {e}")
+            # Return a default brand profile if analysis fails
+            return self._default_brand_profile()
+
+    async def analyze_many(self, urls, concurrency=20):
+        """
+        Analyze many brands' websites concurrently
+
+        For batch onboarding: scrapes and analyzes N sites with bounded
+        concurrency instead of paying N sequential scrape+LLM round trips.
+
+        Args:
+            urls (list): Website URLs, one per brand
+            concurrency (int): Maximum in-flight scrape/analysis pipelines
+
+        Returns:
+            list: One brand profile per URL, in input order
+        """
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(concurrency)
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+
+        async with aiohttp.ClientSession(headers=headers) as session:
+
+            async def _analyze_one(url):
+                async with semaphore:
+                    # Scrape (bounded to 64KB, same as the sync path)
+                    raw = b""
+                    try:
+                        timeout = aiohttp.ClientTimeout(total=10)
+                        async with session.get(url, timeout=timeout) as response:
+                            response.raise_for_status()
+                            raw = await response.content.read(65536)
+                    except Exception as e:
+                        print(f"⚠️ Warning: Could not scrape website: {e}")
+
+                    website_content = self._clean_html(raw) if raw else ""
+                    analysis_prompt = self._build_analysis_prompt(website_content, "", "")
+
+                    try:
+                        response = await self.async_client.chat.completions.create(
+                            model="gpt-4-turbo-preview",
+                            messages=[
+                                {"role": "system", "content": "You are a brand analysis expert. Always respond with valid JSON only."},
+                                {"role": "user", "content": analysis_prompt}
+                            ],
+                            temperature=0.7,
+                            max_tokens=2000,
+                            response_format={"type": "json_object"}
+                        )
+                        return json.loads(response.choices[0].message.content)
+                    except Exception as e:
+                        print(f"❌ Error during brand analysis: {e}")
+                        return self._default_brand_profile()
+
+            return await asyncio.gather(*[_analyze_one(url) for url in urls])
+
+    @staticmethod
+    def _build_analysis_prompt(website_content, posts_text, guidelines_text):
+        """
+        Build the brand analysis prompt from gathered materials
+
+        Args:
+            website_content (str): Cleaned website text
+            posts_text (str): Existing posts joined together
+            guidelines_text (str): Brand guidelines as JSON text
+
+        Returns:
+            str: Complete analysis prompt
+        """
+        return f"""
+You are a brand strategist analyzing company materials to extract brand characteristics.
+
+Analyze the following materials and create a comprehensive brand profile:
+
+WEBSITE CONTENT:
+{website_content if website_content else "Not provided"}
+
+EXISTING SOCIAL MEDIA POSTS:
+{posts_text if posts_text else "Not provided"}
+
+BRAND GUIDELINES:
+{guidelines_text if guidelines_text else "Not provided"}
+
+Extract and return the following in JSON format:
+
+{{
+    "brand_voice": {{
+        "tone": "formal/casual/playful/professional/inspirational",
+        "personality_traits": ["trait1", "trait2", "trait3"],
+        "emoji_usage": "none/minimal/moderate/frequent",
+        "sentence_style": "short and punchy/medium/long and detailed",
+        "language_complexity": "simple/moderate/sophisticated"
+    }},
+    "visual_identity": {{
+        "primary_colors": ["#hexcolor1", "#hexcolor2"],
+        "design_style": "minimal/bold/corporate/creative/tech-focused",
+        "imagery_style": "abstract/photographic/illustrated/mixed"
+    }},
+    "messaging_patterns": {{
+        "key_themes": ["theme1", "theme2", "theme3"],
+        "value_propositions": ["value1", "value2"],
+        "target_audience": "description of target audience",
+        "common_topics": ["topic1", "topic2", "topic3"]
+    }},
+    "cta_style": {{
+        "typical_ctas": ["CTA1", "CTA2", "CTA3"],
+        "cta_placement": "beginning/middle/end",
+        "cta_tone": "urgent/casual/professional/friendly"
+    }},
+    "content_structure": {{
+        "typical_post_length": "short/medium/long",
+        "uses_hashtags": true/false,
+        "hashtag_count": "number or range",
+        "uses_questions": true/false,
+        "uses_statistics": true/false
+    }}
+}}
+
+Be specific and evidence-based. If information is not available, make reasonable inferences based on industry standards.
+Return ONLY the JSON, no other text.
+"""
+
+    def _default_brand_profile(self):
+        """
+        Return a default brand profile as fallback
+        
+        Returns:
+            dict: Default brand profile
+        """
+        return {
+            "brand_voice": {
+                "tone": "professional",
+                "personality_traits": ["innovative", "reliable", "forward-thinking"],
+                "emoji_usage": "moderate",
+                "sentence_style": "medium",
+                "language_complexity": "moderate"
+            },
+            "visual_identity": {
+                "primary_colors": ["#1a73e8", "#34a853"],
+                "design_style": "modern",
+                "imagery_style": "photographic"
+            },
+            "messaging_patterns": {
+                "key_themes": ["innovation", "technology", "growth"],
+                "value_propositions": ["cutting-edge solutions", "reliable service"],
+                "target_audience": "tech-savvy professionals",
+                "common_topics": ["AI", "technology", "business"]
+            },
+            "cta_style": {
+                "typical_ctas": ["Learn more", "Get started", "Join us"],
+                "cta_placement": "end",
+                "cta_tone": "professional"
+            },
+            "content_structure": {
+                "typical_post_length": "medium",
+                "uses_hashtags": True,
+                "hashtag_count": "3-5",
+                "uses_questions": True,
+                "uses_statistics": False
+            }
         }
\ No newline at end of file
@@ -1,258 +1,387 @@
-"""
-Feedback Loop Module
-Implements agentic self-feedback where AI critiques and improves its own outputs
-Uses OpenAI GPT-4 instead of Claude
-"""
-
-import openai
-import json
-import re
-
-
-class FeedbackLoop:
-    """
-    Runs iterative self-improvement on generated posts
-    """
-    
-    def __init__(self, openai_api_key):
-        """
-        Initialize the feedback loop with OpenAI API
-        
-        Args:
-            openai_api_key (str): API key for OpenAI
-        """
-        self.client = openai.OpenAI(api_key=openai_api_key)
-    
-    def iterate(self, post, brand_profile, platform, iterations=2):
-        """
-        Run multiple iterations of self-critique and improvement
-        
-        Args:
-            post (dict): Initial post data
-            brand_profile (dict): Brand profile
-            platform (str): Social platform
-            iterations (int): Number of improvement iterations
-            
-        Returns:
-            dict: Improved post after iterations
-        """
-        current_post = post.copy()
-        
-        for i in range(iterations):
-            print(f"  🔄 Iteration {i + 1}/{iterations}")
-            
-            # Step 1: Critique the current post
-            critique = self._critique_post(current_post, brand_profile, platform)
-            
-            # Step 2: Improve based on critique
-            current_post = self._improve_post(current_post, critique, brand_profile, platform)
-        
-        return current_post
-    
-    def _critique_post(self, post, brand_profile, platform):
-        """
-        AI critiques the post against quality criteria
-        
-        Args:
-            post (dict): Post to critique
-            brand_profile (dict): Brand profile
-            platform (str): Social platform
-            
-        Returns:
-            dict: Critique with scores and suggestions
-        """
-        critique_prompt = f"""
-You are a critical brand manager reviewing a social media post. Be constructive but thorough.
-
-POST TO REVIEW:
-Caption: {post.get('caption', '')}
-Overlay Text: {post.get('overlay_text', '')}
-Image Description: {post.get('image_description', '')}
-Platform: {platform}
-
-BRAND GUIDELINES:
-{json.dumps(brand_profile, indent=2)}
-
-Evaluate the post on these criteria (rate 1-10 for each):
-
-1. BRAND CONSISTENCY
-   - Does it match the brand voice and tone?
-   - Is the language style consistent?
-   - Does it reflect brand values?
-
-2. MESSAGE CLARITY
-   - Is the main message clear and focused?
-   - Is it easy to understand quickly?
-   - Does it avoid jargon or confusion?
-
-3. CTA EFFECTIVENESS
-   - Is there a clear call-to-action?
-   - Is the CTA compelling and specific?
-   - Is it positioned well?
-
-4. TEXT READABILITY ON IMAGE
-   - Is the overlay text short enough?
-   - Will it be readable on mobile?
-   - Does it complement the caption?
-
-5. PLATFORM APPROPRIATENESS
-   - Does it fit {platform} best practices?
-   - Is the length appropriate?
-   - Does it use platform features well (hashtags, etc.)?
-
-6. ENGAGEMENT POTENTIAL
-   - Will this capture attention?
-   - Does it encourage interaction?
-   - Is it shareable?
-
-Return in JSON format:
-{{
-    "scores": {{
-        "brand_consistency": 8,
-        "message_clarity": 7,
-        "cta_effectiveness": 6,
-        "text_readability": 9,
-        "platform_appropriateness": 8,
-        "engagement_potential": 7
-    }},
-    "overall_score": 7.5,
-    "strengths": ["strength1", "strength2"],
-    "weaknesses": ["weakness1", "weakness2"],
-    "specific_improvements": [
-        "Specific suggestion 1",
-        "Specific suggestion 2",
-        "Specific suggestion 3"
-    ],
-    "priority_fix": "The single most important thing to improve"
-}}
-
-Be specific and actionable in your feedback.
-Return ONLY the JSON, no other text.
-"""
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are a brand review expert. Always respond with valid JSON only."},
-                    {"role": "user", "content": critique_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            response_text = response.choices[0].message.content
-            
-            # Parse JSON
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                critique = json.loads(json_match.group(1))
-            else:
-                critique = json.loads(response_text)
-            
-            return critique
-            
-        except Exception as e:
-            print(f"⚠️ Critique error: {e}")
-            return self._default_critique()
-    
-    def _improve_post(self, post, critique, brand_profile, platform):
-        """
-        Improve the post based on critique
-        
-        Args:
-            post (dict): Current post
-            critique (dict): Critique results
-            brand_profile (dict): Brand profile
-            platform (str): Social platform
-            
-        Returns:
-            dict: Improved post
-        """
-        improvement_prompt = f"""
-You are improving a social media post based on expert feedback.
-
-CURRENT POST:
-{json.dumps(post, indent=2)}
-
-CRITIQUE RECEIVED:
-Overall Score: {critique.get('overall_score', 7)}/10
-Weaknesses: {', '.join(critique.get('weaknesses', []))}
-Priority Fix: {critique.get('priority_fix', 'Improve overall quality')}
-Specific Improvements Needed:
-{chr(10).join([f"- {imp}" for imp in critique.get('specific_improvements', [])])}
-
-BRAND PROFILE:
-{json.dumps(brand_profile, indent=2)}
-
-Create an improved version that addresses the critique while maintaining what worked well.
-Focus especially on the priority fix and specific improvements.
-
-Return in JSON format:
-{{
-    "caption": "Improved caption...",
-    "overlay_text": "Improved overlay text",
-    "hashtags": ["hashtag1", "hashtag2"],
-    "cta": "Improved CTA",
-    "hook": "Improved hook",
-    "image_description": "Improved image description",
-    "improvements_made": "Brief summary of what was improved"
-}}
-
-Return ONLY the JSON, no other text.
-"""
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are a social media improvement expert. Always respond with valid JSON only."},
-                    {"role": "user", "content": improvement_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            response_text = response.choices[0].message.content
-            
-            # Parse JSON
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                improved_post = json.loads(json_match.group(1))
-            else:
-                improved_post = json.loads(response_text)
-            
-            # Preserve metadata
-            improved_post['platform'] = post.get('platform')
-            improved_post['intent'] = post.get('intent')
-            improved_post['variation_number'] = post.get('variation_number')
-            improved_post['critique_score'] = critique.get('overall_score')
-            
-            return improved_post
-            
-        except Exception as e:
-            print(f"⚠️ Improvement error: {e}")
-            return post
-    
-    def _default_critique(self):
-        """
-        Return a default critique if API call fails
-        
-        Returns:
-            dict: Default critique
-        """
-        return {
-            "scores": {
-                "brand_consistency": 7,
-                "message_clarity": 7,
-                "cta_effectiveness": 7,
-                "text_readability": 7,
-                "platform_appropriateness": 7,
-                "engagement_potential": 7
-            },
-            "overall_score": 7.0,
-            "strengths": ["Clear message"],
-            "weaknesses": ["Could be more engaging"],
-            "specific_improvements": ["Enhance the hook", "Strengthen the CTA"],
-            "priority_fix": "Make the opening more attention-grabbing"
-        }
\ No newline at end of file
+"""
+Feedback Loop Module
+Implements agentic self-feedback where AI critiques and improves its own outputs
+Uses OpenAI GPT-4 instead of Claude
+"""
+
+import asyncio
+
+import openai
+import orjson
+from pydantic import BaseModel
+
+from . import llm_cache
+
+
+# Static critique-and-improve rubric. Lives at the top of the system prompt so
+# every call in a run shares the same prefix for OpenAI prompt caching.
+_RUBRIC = """You are a critical brand manager reviewing social media posts, then rewriting them to fix what you found. Be constructive but thorough.
+
+For each post you receive, first evaluate it on these criteria (rate 1-10 for each):
+
+1. BRAND CONSISTENCY
+   - Does it match the brand voice and tone?
+   - Is the language style consistent?
+   - Does it reflect brand values?
+
+2. MESSAGE CLARITY
+   - Is the main message clear and focused?
+   - Is it easy to understand quickly?
+   - Does it avoid jargon or confusion?
+
+3. CTA EFFECTIVENESS
+   - Is there a clear call-to-action?
+   - Is the CTA compelling and specific?
+   - Is it positioned well?
+
+4. TEXT READABILITY ON IMAGE
+   - Is the overlay text short enough?
+   - Will it be readable on mobile?
+   - Does it complement the caption?
+
+5. PLATFORM APPROPRIATENESS
+   - Does it fit the target platform's best practices?
+   - Is the length appropriate?
+   - Does it use platform features well (hashtags, etc.)?
+
+6. ENGAGEMENT POTENTIAL
+   - Will this capture attention?
+   - Does it encourage interaction?
+   - Is it shareable?
+
+Then, write an improved version that addresses your critique while keeping what worked well. Focus especially on the priority fix.
+
+Return in JSON format:
+{
+    "critique": {
+        "scores": {
+            "brand_consistency": 8,
+            "message_clarity": 7,
+            "cta_effectiveness": 6,
+            "text_readability": 9,
+            "platform_appropriateness": 8,
+            "engagement_potential": 7
+        },
+        "overall_score": 7.5,
+        "strengths": ["strength1", "strength2"],
+        "weaknesses": ["weakness1", "weakness2"],
+        "priority_fix": "The single most important thing to improve"
+    },
+    "improved_post": {
+        "caption": "Improved caption...",
+        "overlay_text": "Improved overlay text",
+        "hashtags": ["hashtag1", "hashtag2"],
+        "cta": "Improved CTA",
+        "hook": "Improved hook",
+        "image_description": "Improved image description",
+        "improvements_made": "Brief summary of what was improved"
+    }
+}
+
+Be specific and actionable in your critique.
+Return ONLY the JSON, no other text."""
+
+
+def _extract_string_field(buffer, field):
+    """
+    Pull a completed top-level string field out of a partial JSON buffer
+
+    Used while streaming: returns the decoded value once the field's closing
+    quote has arrived, or None if the field is absent or still incomplete.
+
+    Args:
+        buffer (str): JSON text accumulated so far
+        field (str): Field name to look for
+
+    Returns:
+        str or None: Decoded field value, or None
+    """
+    marker = f'"{field}"'
+    start = buffer.find(marker)
+    if start == -1:
+        return None
+
+    colon = buffer.find(':', start + len(marker))
+    if colon == -1:
+        return None
+
+    open_quote = buffer.find('"', colon + 1)
+    if open_quote == -1:
+        return None
+
+    i = open_quote + 1
+    while i < len(buffer):
+        ch = buffer[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '"':
+            return orjson.loads(buffer[open_quote:i + 1])
+        i += 1
+
+    return None
+
+
+class Critique(BaseModel):
+    """Rubric scores and findings for one post"""
+    scores: dict = {}
+    overall_score: float = 7.0
+    strengths: list = []
+    weaknesses: list = []
+    priority_fix: str = ""
+
+
+class FeedbackResult(BaseModel):
+    """One critique+improve response from the model"""
+    critique: Critique = Critique()
+    improved_post: dict
+
+
+class FeedbackLoop:
+    """
+    Runs iterative self-improvement on generated posts
+    """
+
+    # Critique score at which further improvement iterations are skipped
+    GOOD_ENOUGH_SCORE = 8.5
+
+    def __init__(self, openai_api_key=None, async_client=None):
+        """
+        Initialize the feedback loop with OpenAI API
+
+        Args:
+            openai_api_key (str): API key for OpenAI
+            async_client (openai.AsyncOpenAI): Optional shared async client
+        """
+        # Async client so independent variations can run their loops concurrently
+        self.client = async_client or openai.AsyncOpenAI(api_key=openai_api_key)
+
+    async def iterate(self, post, brand_profile, platform, iterations=2):
+        """
+        Run multiple iterations of self-critique and improvement
+
+        Args:
+            post (dict): Initial post data
+            brand_profile (dict): Brand profile
+            platform (str): Social platform
+            iterations (int): Number of improvement iterations
+
+        Returns:
+            dict: Improved post after iterations
+        """
+        current_post = post
+
+        for i in range(iterations):
+            print(f"  🔄 Iteration {i + 1}/{iterations}")
+
+            current_post = (await self.step([current_post], brand_profile, platform))[0]
+
+            # Good enough - further iterations rarely move a high-scoring
+            # post, so stop paying for them
+            if self.is_good_enough(current_post):
+                print(f"  ✅ Score {current_post.get('critique_score')}/10 - stopping early")
+                break
+
+        return current_post
+
+    async def step(self, posts, brand_profile, platform, on_image_description=None):
+        """
+        Run one critique+improve pass over several posts concurrently
+
+        Iteration N+1 of a variation depends on iteration N, but the same
+        iteration across variations does not - so callers drive the loop as
+        wavefronts: all variations' iteration 1 in parallel, then iteration 2.
+
+        Args:
+            posts (list): Posts to critique and improve, one per variation
+            brand_profile (dict): Brand profile
+            platform (str): Social platform
+            on_image_description (callable): Optional (index, description)
+                callback fired as soon as each post's image_description has
+                finished streaming, before the rest of the response lands
+
+        Returns:
+            list: Improved posts, in input order
+        """
+        # Built once per wave: identical across variations, so OpenAI prompt
+        # caching can hit on the shared rubric + profile prefix
+        system_prompt = self._build_system_prompt(brand_profile)
+
+        improved = await asyncio.gather(*[
+            self._critique_and_improve(
+                post, system_prompt, platform,
+                on_image_description=(
+                    (lambda desc, idx=idx: on_image_description(idx, desc))
+                    if on_image_description else None
+                )
+            )
+            for idx, post in enumerate(posts)
+        ])
+
+        # Metadata is stamped onto each new post rather than copying the
+        # whole (large-string) dict through every iteration
+        for original, new_post in zip(posts, improved):
+            if new_post is not original:
+                new_post.update({
+                    'platform': original.get('platform'),
+                    'intent': original.get('intent'),
+                    'variation_number': original.get('variation_number')
+                })
+
+        return list(improved)
+
+    def is_good_enough(self, post):
+        """
+        Whether a post's last critique score clears the early-exit bar
+
+        Args:
+            post (dict): Post with an optional critique_score
+
+        Returns:
+            bool: True if further iterations can be skipped
+        """
+        score = post.get('critique_score')
+        return score is not None and score >= self.GOOD_ENOUGH_SCORE
+
+    def _build_system_prompt(self, brand_profile):
+        """
+        Build the static system prompt (rubric + brand profile)
+
+        Kept byte-identical across all variations and iterations of a run so
+        the common ~2-4K prompt tokens qualify for cached-prefix pricing;
+        only the post-specific content goes in the user message.
+
+        Args:
+            brand_profile (dict): Brand profile
+
+        Returns:
+            str: System prompt
+        """
+        profile_json = orjson.dumps(
+            brand_profile, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        ).decode()
+        return _RUBRIC + "\n\nBRAND GUIDELINES:\n" + profile_json
+
+    async def _critique_and_improve(self, post, system_prompt, platform,
+                                    on_image_description=None):
+        """
+        AI critiques the post and produces an improved version in one call
+
+        A single round trip per iteration instead of separate critique and
+        improve calls - halves API calls (and their network/queue overhead)
+        without changing the critique rubric.
+
+        Args:
+            post (dict): Post to critique and improve
+            system_prompt (str): Stable rubric + brand profile prompt
+            platform (str): Social platform
+            on_image_description (callable): Optional callback fired with the
+                improved post's image_description as soon as it has finished
+                streaming - lets image generation start before the full
+                response lands
+
+        Returns:
+            dict: Improved post with critique score attached
+        """
+        # Only the dynamic, post-specific content goes in the user message
+        user_prompt = f"""POST TO REVIEW:
+{orjson.dumps(post, option=orjson.OPT_INDENT_2).decode()}
+Platform: {platform}
+"""
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        # The rewrite half of the call still benefits from sampling variety,
+        # so temperature stays up; the fixed seed makes repeat runs
+        # reproducible and cache-friendly. The critique block runs <400
+        # tokens and the improved post well under 1000; generation time
+        # scales with max_tokens.
+        params = dict(
+            model="gpt-4-turbo-preview",
+            temperature=0.7,
+            seed=42,
+            max_tokens=1500,
+            response_format={"type": "json_object"}
+        )
+
+        try:
+            if on_image_description is None:
+                # Cached on disk - identical post/profile pairs skip the call
+                response_text = await llm_cache.cached_chat_async(
+                    self.client, messages=messages, **params)
+            else:
+                response_text = await self._streamed_chat(
+                    messages, params, on_image_description)
+
+            # JSON mode guarantees a bare JSON body; pydantic (Rust-backed)
+            # validates the schema and fills defaults for missing fields
+            result = FeedbackResult.model_validate_json(response_text)
+
+            improved_post = result.improved_post
+
+            # Metadata preservation happens in iterate(); only the score is
+            # attached here
+            improved_post['critique_score'] = result.critique.overall_score
+
+            return improved_post
+
+        except Exception as e:
+            print(f"⚠️ Feedback iteration error: {e}")
+            # If the failure was a cached response that doesn't validate,
+            # drop it so the next identical request retries the API
+            # instead of re-failing on the same entry forever
+            llm_cache.delete(llm_cache.make_key(messages=messages, **params))
+            return post
+
+    async def _streamed_chat(self, messages, params, on_image_description):
+        """
+        Run a completion with streaming, firing the image callback early
+
+        Checks the disk cache first; on a miss, streams the response and
+        invokes on_image_description the moment the improved post's
+        image_description field is complete, so the DALL-E round trip can
+        overlap the remaining token generation.
+
+        Args:
+            messages (list): Chat messages
+            params (dict): Completion parameters
+            on_image_description (callable): Called once with the description
+
+        Returns:
+            str: Full response text
+        """
+        key = llm_cache.make_key(messages=messages, **params)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            description = _extract_string_field(cached, 'image_description')
+            if description:
+                on_image_description(description)
+            return cached
+
+        stream = await self.client.chat.completions.create(
+            messages=messages, stream=True, **params)
+
+        buffer = ""
+        fired = False
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            buffer += chunk.choices[0].delta.content or ""
+            if not fired:
+                description = _extract_string_field(buffer, 'image_description')
+                if description:
+                    fired = True
+                    on_image_description(description)
+
+        # Only cache responses that honor the JSON-mode guarantee; a stream
+        # cut off at max_tokens leaves the buffer unparseable and caching it
+        # would make every rerun fail on the same truncated entry
+        try:
+            orjson.loads(buffer)
+        except orjson.JSONDecodeError:
+            print("⚠️ Not caching truncated/invalid feedback response")
+        else:
+            llm_cache.put(key, buffer)
+        return buffer
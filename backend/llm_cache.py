@@ -0,0 +1,134 @@
+"""
+LLM Response Cache
+On-disk cache for chat completion responses so identical requests
+(same model, messages, and sampling settings) skip the API round trip
+"""
+
+import hashlib
+import json
+from diskcache import Cache
+
+# Shared across modules; diskcache handles concurrent access safely
+_cache = Cache("data/.llm_cache")
+
+
+def make_key(model, messages, **kwargs):
+    """
+    Build a stable cache key from the full request content
+
+    Args:
+        model (str): Model name
+        messages (list): Chat messages
+        **kwargs: Other request parameters (temperature, max_tokens, etc.)
+
+    Returns:
+        str: SHA-256 hex digest of the canonicalized request
+    """
+    payload = json.dumps(
+        {'model': model, 'messages': messages, **kwargs},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get(key):
+    """
+    Look up a cached response
+
+    Args:
+        key (str): Cache key from make_key()
+
+    Returns:
+        str or None: Cached response text, or None on miss
+    """
+    return _cache.get(key)
+
+
+def put(key, value):
+    """
+    Store a response text under a key
+
+    Args:
+        key (str): Cache key from make_key()
+        value (str): Response text to cache
+    """
+    _cache.set(key, value)
+
+
+def delete(key):
+    """
+    Drop a cached response
+
+    Callers that fail to parse a cached response should delete it so the
+    next identical request retries the API instead of re-failing on the
+    same bad entry forever.
+
+    Args:
+        key (str): Cache key from make_key()
+    """
+    _cache.delete(key)
+
+
+def _parseable(text, kwargs):
+    """Whether a response meets the JSON guarantee the request asked for"""
+    if kwargs.get('response_format', {}).get('type') != 'json_object':
+        return True
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+
+def cached_chat(client, model, messages, **kwargs):
+    """
+    Chat completion with response caching (sync client)
+
+    Args:
+        client (openai.OpenAI): OpenAI client
+        model (str): Model name
+        messages (list): Chat messages
+        **kwargs: Passed through to chat.completions.create
+
+    Returns:
+        str: Response message content
+    """
+    key = make_key(model, messages, **kwargs)
+    text = get(key)
+    if text is not None:
+        return text
+
+    response = client.chat.completions.create(model=model, messages=messages, **kwargs)
+    text = response.choices[0].message.content
+    # Validate before caching: a completion truncated at max_tokens comes
+    # back as invalid JSON, and caching it would pin the parse failure
+    # permanently (every identical request re-fails without ever retrying)
+    if _parseable(text, kwargs):
+        put(key, text)
+    return text
+
+
+async def cached_chat_async(client, model, messages, **kwargs):
+    """
+    Chat completion with response caching (async client)
+
+    Args:
+        client (openai.AsyncOpenAI): Async OpenAI client
+        model (str): Model name
+        messages (list): Chat messages
+        **kwargs: Passed through to chat.completions.create
+
+    Returns:
+        str: Response message content
+    """
+    key = make_key(model, messages, **kwargs)
+    text = get(key)
+    if text is not None:
+        return text
+
+    response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+    text = response.choices[0].message.content
+    # Same validate-before-put guard as cached_chat
+    if _parseable(text, kwargs):
+        put(key, text)
+    return text
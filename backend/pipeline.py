@@ -0,0 +1,83 @@
+"""
+Content Pipeline Module
+Fuses post generation and image generation into one async flow
+"""
+
+import asyncio
+
+from .post_generator import PostGenerator
+from .image_generator import ImageGenerator
+
+
+class ContentPipeline:
+    """
+    Runs post + image generation with minimal API fanout
+
+    The generation prompt already returns all N variations (captions and
+    image descriptions included) from a single chat completion; the missing
+    piece was the image side, which still fanned out N serial DALL-E calls.
+    This pipeline does one LLM call, then gathers all N DALL-E calls on one
+    event loop - two waits total, regardless of N.
+    """
+
+    def __init__(self, openai_api_key):
+        """
+        Initialize the pipeline components
+
+        Args:
+            openai_api_key (str): API key for OpenAI
+        """
+        self.post_generator = PostGenerator(openai_api_key)
+        self.image_generator = ImageGenerator(openai_api_key)
+
+    async def generate_all(self, brand_profile, intent, platform, n=3,
+                           constraints=None, rag_elements=None):
+        """
+        Generate N variations with backgrounds in one LLM call + one gather
+
+        Args:
+            brand_profile (dict): Brand profile from analyzer
+            intent (str): What the post should accomplish
+            platform (str): "linkedin" or "instagram"
+            n (int): Number of variations
+            constraints (dict): Optional constraints (date, tone, CTA)
+            rag_elements (dict): Optional elements (speaker names, etc.)
+
+        Returns:
+            list: Post variations, each with an image_path attached
+        """
+        posts = await self.post_generator.generate_variations(
+            brand_profile=brand_profile,
+            intent=intent,
+            platform=platform,
+            constraints=constraints,
+            rag_elements=rag_elements,
+            num_variations=n
+        )
+        if not posts:
+            return []
+
+        image_paths = await self.image_generator.generate_backgrounds_batch_async(
+            posts, brand_profile, platform
+        )
+
+        for post, image_path in zip(posts, image_paths):
+            post['image_path'] = image_path
+
+        return posts
+
+    def generate_all_sync(self, brand_profile, intent, platform, n=3,
+                          constraints=None, rag_elements=None):
+        """
+        Synchronous wrapper around generate_all for non-async callers
+
+        Args:
+            (same as generate_all)
+
+        Returns:
+            list: Post variations, each with an image_path attached
+        """
+        return asyncio.run(self.generate_all(
+            brand_profile, intent, platform, n=n,
+            constraints=constraints, rag_elements=rag_elements
+        ))
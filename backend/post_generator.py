@@ -1,279 +1,403 @@
-"""
-Post Generator Module
-Generates social media post captions and content based on brand profile
-Uses OpenAI GPT-4 instead of Claude
-"""
-
-import openai
-import json
-import re
-
-
-class PostGenerator:
-    """
-    Generates social media posts with multiple variations
-    """
-    
-    def __init__(self, openai_api_key):
-        """
-        Initialize the post generator with OpenAI API
-        
-        Args:
-            openai_api_key (str): API key for OpenAI
-        """
-        self.client = openai.OpenAI(api_key=openai_api_key)
-    
-    def generate_variations(self, brand_profile, intent, platform, constraints=None, 
-                          rag_elements=None, num_variations=3):
-        """
-        Generate multiple variations of a social media post
-        
-        Args:
-            brand_profile (dict): Brand profile from analyzer
-            intent (str): What the post should accomplish
-            platform (str): "linkedin" or "instagram"
-            constraints (dict): Optional constraints (date, tone, CTA)
-            rag_elements (dict): Optional elements (speaker names, images, etc.)
-            num_variations (int): Number of variations to generate
-            
-        Returns:
-            list: List of post variations
-        """
-        # Set platform-specific guidelines
-        platform_specs = self._get_platform_specs(platform)
-        
-        # Build the generation prompt
-        prompt = self._build_generation_prompt(
-            brand_profile=brand_profile,
-            intent=intent,
-            platform=platform,
-            platform_specs=platform_specs,
-            constraints=constraints,
-            rag_elements=rag_elements,
-            num_variations=num_variations
-        )
-        
-        try:
-            print(f"🤖 Generating {num_variations} post variations...")
-            
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are a social media content expert. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=3000
-            )
-            
-            # Extract response
-            response_text = response.choices[0].message.content
-            
-            # Parse JSON response
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                variations = json.loads(json_match.group(1))
-            else:
-                variations = json.loads(response_text)
-            
-            # Add metadata to each variation
-            for idx, variation in enumerate(variations['posts']):
-                variation['platform'] = platform
-                variation['intent'] = intent
-                variation['variation_number'] = idx + 1
-            
-            return variations['posts']
-            
-        except Exception as e:
-            print(f"❌ Error generating posts: {e}")
-            return []
-    
-    def _build_generation_prompt(self, brand_profile, intent, platform, platform_specs, 
-                                 constraints, rag_elements, num_variations):
-        """
-        Build the prompt for post generation
-        
-        Args:
-            brand_profile (dict): Brand profile
-            intent (str): Post intent
-            platform (str): Social platform
-            platform_specs (dict): Platform-specific specs
-            constraints (dict): Optional constraints
-            rag_elements (dict): Optional RAG elements
-            num_variations (int): Number of variations
-            
-        Returns:
-            str: Complete prompt
-        """
-        # Extract key brand characteristics
-        tone = brand_profile['brand_voice']['tone']
-        emoji_usage = brand_profile['brand_voice']['emoji_usage']
-        cta_style = brand_profile['cta_style']['typical_ctas']
-        
-        # Build constraints section
-        constraints_text = ""
-        if constraints:
-            constraints_text = f"\nADDITIONAL CONSTRAINTS:\n{json.dumps(constraints, indent=2)}"
-        
-        # Build RAG elements section
-        rag_text = ""
-        if rag_elements:
-            rag_text = f"\nELEMENTS TO INCLUDE:\n{json.dumps(rag_elements, indent=2)}"
-        
-        prompt = f"""
-You are a social media content creator. Generate {num_variations} variations of a {platform} post.
-
-INTENT: {intent}
-
-BRAND PROFILE:
-- Tone: {tone}
-- Emoji usage: {emoji_usage}
-- Typical CTAs: {', '.join(cta_style[:3])}
-- Brand voice: {json.dumps(brand_profile['brand_voice'], indent=2)}
-- Messaging patterns: {json.dumps(brand_profile['messaging_patterns'], indent=2)}
-
-PLATFORM SPECS ({platform.upper()}):
-{json.dumps(platform_specs, indent=2)}
-{constraints_text}
-{rag_text}
-
-Generate {num_variations} creative, on-brand variations. Each should be distinct in approach but aligned with brand voice.
-
-Return in this JSON format:
-{{
-    "posts": [
-        {{
-            "caption": "Full post text here...",
-            "overlay_text": "Short punchy text for image overlay (5-10 words max)",
-            "hashtags": ["hashtag1", "hashtag2"],
-            "cta": "Call to action",
-            "hook": "Opening sentence or hook",
-            "image_description": "Description of ideal background image",
-            "reasoning": "Brief explanation of this variation's approach"
-        }}
-    ]
-}}
-
-Make the posts engaging, authentic, and truly aligned with the brand voice. Vary the approaches:
-- Variation 1: More direct and action-oriented
-- Variation 2: More storytelling or emotional
-- Variation 3: More data-driven or informative
-
-Return ONLY the JSON, no other text.
-"""
-        
-        return prompt
-    
-    def _get_platform_specs(self, platform):
-        """
-        Get platform-specific specifications
-        
-        Args:
-            platform (str): "linkedin" or "instagram"
-            
-        Returns:
-            dict: Platform specifications
-        """
-        specs = {
-            "linkedin": {
-                "ideal_length": "150-300 words",
-                "max_length": "3000 characters",
-                "tone": "professional but conversational",
-                "hashtags": "3-5 relevant hashtags",
-                "line_breaks": "Use line breaks for readability",
-                "emojis": "Use sparingly, professionally",
-                "best_practices": [
-                    "Start with a hook",
-                    "Use short paragraphs",
-                    "Include a clear CTA",
-                    "Tag relevant people/companies when appropriate"
-                ]
-            },
-            "instagram": {
-                "ideal_length": "100-200 words",
-                "max_length": "2200 characters",
-                "tone": "casual and engaging",
-                "hashtags": "5-10 relevant hashtags",
-                "line_breaks": "Use line breaks and spacing",
-                "emojis": "Use freely to enhance message",
-                "best_practices": [
-                    "Front-load the key message",
-                    "Use emojis as visual breaks",
-                    "Include relevant hashtags",
-                    "Encourage engagement (likes, shares, comments)"
-                ]
-            }
-        }
-        
-        return specs.get(platform, specs["linkedin"])
-    
-    def refine_with_feedback(self, post_data, user_feedback, brand_profile):
-        """
-        Refine a post based on user feedback
-        
-        Args:
-            post_data (dict): Original post data
-            user_feedback (str): User's feedback or requests
-            brand_profile (dict): Brand profile
-            
-        Returns:
-            dict: Refined post
-        """
-        prompt = f"""
-You are refining a social media post based on user feedback.
-
-ORIGINAL POST:
-{json.dumps(post_data, indent=2)}
-
-BRAND PROFILE:
-{json.dumps(brand_profile, indent=2)}
-
-USER FEEDBACK:
-{user_feedback}
-
-Generate an improved version that addresses the feedback while maintaining brand alignment.
-
-Return in this JSON format:
-{{
-    "caption": "Updated post text...",
-    "overlay_text": "Updated overlay text",
-    "hashtags": ["hashtag1", "hashtag2"],
-    "cta": "Updated CTA",
-    "hook": "Updated hook",
-    "image_description": "Updated image description",
-    "changes_made": "Summary of what was changed and why"
-}}
-
-Return ONLY the JSON, no other text.
-"""
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are a social media expert. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            response_text = response.choices[0].message.content
-            
-            # Parse JSON
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                refined_post = json.loads(json_match.group(1))
-            else:
-                refined_post = json.loads(response_text)
-            
-            # Preserve original metadata
-            refined_post['platform'] = post_data.get('platform')
-            refined_post['intent'] = post_data.get('intent')
-            
-            return refined_post
-            
-        except Exception as e:
-            print(f"❌ Error refining post: {e}")
+"""
+Post Generator Module
+Generates social media post captions and content based on brand profile
+Uses OpenAI GPT-4 instead of Claude
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+
+import openai
+import json
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+
+# Platform specifications are static - build them (and their prompt-ready
+# JSON serialization) once at import instead of per generation call
+_PLATFORM_SPECS = {
+    "linkedin": {
+        "ideal_length": "150-300 words",
+        "max_length": "3000 characters",
+        "tone": "professional but conversational",
+        "hashtags": "3-5 relevant hashtags",
+        "line_breaks": "Use line breaks for readability",
+        "emojis": "Use sparingly, professionally",
+        "best_practices": [
+            "Start with a hook",
+            "Use short paragraphs",
+            "Include a clear CTA",
+            "Tag relevant people/companies when appropriate"
+        ]
+    },
+    "instagram": {
+        "ideal_length": "100-200 words",
+        "max_length": "2200 characters",
+        "tone": "casual and engaging",
+        "hashtags": "5-10 relevant hashtags",
+        "line_breaks": "Use line breaks and spacing",
+        "emojis": "Use freely to enhance message",
+        "best_practices": [
+            "Front-load the key message",
+            "Use emojis as visual breaks",
+            "Include relevant hashtags",
+            "Encourage engagement (likes, shares, comments)"
+        ]
+    }
+}
+
+_PLATFORM_SPECS_JSON = {
+    platform: json.dumps(specs, indent=2)
+    for platform, specs in _PLATFORM_SPECS.items()
+}
+
+# Rendered brand-context prompt blocks, keyed by profile content hash. The
+# same brand profile gets serialized into every generation prompt; caching
+# the block makes prompt assembly a plain f-string concat after the first call
+_BRAND_CONTEXT_CACHE = {}
+
+
+def _brand_context_block(brand_profile):
+    """
+    Render (and cache) the brand-profile section of the generation prompt
+
+    Args:
+        brand_profile (dict): Brand profile from analyzer
+
+    Returns:
+        str: Prompt-ready brand context block
+    """
+    key = hashlib.md5(
+        json.dumps(brand_profile, sort_keys=True).encode()
+    ).hexdigest()
+
+    block = _BRAND_CONTEXT_CACHE.get(key)
+    if block is None:
+        voice = brand_profile['brand_voice']
+        cta_style = brand_profile['cta_style']['typical_ctas']
+        block = f"""- Tone: {voice['tone']}
+- Emoji usage: {voice['emoji_usage']}
+- Typical CTAs: {', '.join(cta_style[:3])}
+- Brand voice: {json.dumps(voice, indent=2)}
+- Messaging patterns: {json.dumps(brand_profile['messaging_patterns'], indent=2)}"""
+        _BRAND_CONTEXT_CACHE[key] = block
+    return block
+
+
+# Pre-serialized compact profiles for the refine prompt, keyed like the
+# context blocks above
+_COMPACT_PROFILE_CACHE = {}
+
+
+def _compact_profile_json(brand_profile):
+    """
+    Serialize just the profile fields the refine prompt uses, cached
+
+    The full profile can run tens of KB of JSON; the model only needs the
+    voice, CTA and messaging fields to keep a refinement on-brand, and the
+    rest is prompt tokens paid for on every refine.
+
+    Args:
+        brand_profile (dict): Brand profile from analyzer
+
+    Returns:
+        str: JSON of the brand_voice, cta_style and messaging_patterns fields
+    """
+    # A missing profile (e.g. a restored session that was never re-analyzed)
+    # must degrade to an empty block, not a TypeError before the API call
+    if not brand_profile:
+        return "{}"
+
+    key = hashlib.md5(
+        json.dumps(brand_profile, sort_keys=True).encode()
+    ).hexdigest()
+
+    compact = _COMPACT_PROFILE_CACHE.get(key)
+    if compact is None:
+        compact = json.dumps({
+            k: brand_profile[k]
+            for k in ('brand_voice', 'cta_style', 'messaging_patterns')
+            if k in brand_profile
+        }, indent=2)
+        _COMPACT_PROFILE_CACHE[key] = compact
+    return compact
+
+
+class Post(BaseModel):
+    """Schema for one generated post variation"""
+    caption: str
+    overlay_text: str
+    hashtags: list[str]
+    cta: str
+    hook: str
+    image_description: str
+    reasoning: str
+
+
+class Variations(BaseModel):
+    """Schema for a full generation response"""
+    posts: list[Post]
+
+
+class PostGenerator:
+    """
+    Generates social media posts with multiple variations
+    """
+    
+    def __init__(self, openai_api_key=None, model=None, async_client=None):
+        """
+        Initialize the post generator with OpenAI API
+
+        Args:
+            openai_api_key (str): API key for OpenAI
+            model (str): Chat model to use; defaults to the POSTGEN_MODEL
+                env var or gpt-4o-mini. gpt-4o-mini is several times faster
+                and cheaper per token than the gpt-4-turbo family for the
+                same JSON schema; pass gpt-4o when final quality matters
+            async_client (openai.AsyncOpenAI): Optional shared async client
+        """
+        # Async client so batch callers can keep several requests in flight;
+        # the semaphore bounds concurrency to stay under API rate limits
+        self.client = async_client or openai.AsyncOpenAI(api_key=openai_api_key)
+        self._sem = asyncio.Semaphore(5)
+        self.model = model or os.getenv("POSTGEN_MODEL", "gpt-4o-mini")
+
+    async def generate_variations(self, brand_profile, intent, platform, constraints=None,
+                          rag_elements=None, num_variations=3):
+        """
+        Generate multiple variations of a social media post
+
+        All variations come back from a single chat completion (the prompt
+        asks for a JSON array of num_variations posts), so latency is one
+        round trip regardless of how many variations are requested.
+
+        Args:
+            brand_profile (dict): Brand profile from analyzer
+            intent (str): What the post should accomplish
+            platform (str): "linkedin" or "instagram"
+            constraints (dict): Optional constraints (date, tone, CTA)
+            rag_elements (dict): Optional elements (speaker names, images, etc.)
+            num_variations (int): Number of variations to generate
+            
+        Returns:
+            list: List of post variations
+        """
+        # Set platform-specific guidelines
+        platform_specs = self._get_platform_specs(platform)
+        
+        # Build the generation prompt
+        prompt = self._build_generation_prompt(
+            brand_profile=brand_profile,
+            intent=intent,
+            platform=platform,
+            platform_specs=platform_specs,
+            constraints=constraints,
+            rag_elements=rag_elements,
+            num_variations=num_variations
+        )
+        
+        try:
+            logger.info(f"🤖 Generating {num_variations} post variations...")
+
+            # Structured outputs: the API enforces the Variations schema
+            # server-side, so malformed JSON (and the silent empty-list
+            # fallback it used to trigger) is no longer a failure mode
+            async with self._sem:
+                response = await self.client.beta.chat.completions.parse(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You are a social media content expert."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,
+                    max_tokens=3000,
+                    response_format=Variations
+                )
+
+            variations = response.choices[0].message.parsed
+
+            # Add metadata to each variation
+            posts = []
+            for idx, variation in enumerate(variations.posts):
+                post = variation.model_dump()
+                post['platform'] = platform
+                post['intent'] = intent
+                post['variation_number'] = idx + 1
+                posts.append(post)
+
+            return posts
+            
+        except Exception as e:
+            logger.warning(f"❌ Error generating posts: {e}")
+            return []
+    
+    async def generate_variations_batch(self, requests):
+        """
+        Generate posts for several intents/platforms concurrently
+
+        Each entry is a kwargs dict for generate_variations; the shared
+        semaphore keeps at most 5 API calls in flight.
+
+        Args:
+            requests (list): List of generate_variations kwargs dicts
+
+        Returns:
+            list: One variations list per request, in input order
+        """
+        return await asyncio.gather(
+            *[self.generate_variations(**request) for request in requests]
+        )
+
+    def _build_generation_prompt(self, brand_profile, intent, platform, platform_specs, 
+                                 constraints, rag_elements, num_variations):
+        """
+        Build the prompt for post generation
+        
+        Args:
+            brand_profile (dict): Brand profile
+            intent (str): Post intent
+            platform (str): Social platform
+            platform_specs (dict): Platform-specific specs
+            constraints (dict): Optional constraints
+            rag_elements (dict): Optional RAG elements
+            num_variations (int): Number of variations
+            
+        Returns:
+            str: Complete prompt
+        """
+        # Brand context is rendered once per profile and cached by content hash
+        brand_context = _brand_context_block(brand_profile)
+
+        # Build constraints section
+        constraints_text = ""
+        if constraints:
+            constraints_text = f"\nADDITIONAL CONSTRAINTS:\n{json.dumps(constraints, indent=2)}"
+        
+        # Build RAG elements section
+        rag_text = ""
+        if rag_elements:
+            rag_text = f"\nELEMENTS TO INCLUDE:\n{json.dumps(rag_elements, indent=2)}"
+        
+        prompt = f"""
+You are a social media content creator. Generate {num_variations} variations of a {platform} post.
+
+INTENT: {intent}
+
+BRAND PROFILE:
+{brand_context}
+
+PLATFORM SPECS ({platform.upper()}):
+{_PLATFORM_SPECS_JSON.get(platform, _PLATFORM_SPECS_JSON["linkedin"])}
+{constraints_text}
+{rag_text}
+
+Generate {num_variations} creative, on-brand variations. Each should be distinct in approach but aligned with brand voice.
+
+Return in this JSON format:
+{{
+    "posts": [
+        {{
+            "caption": "Full post text here...",
+            "overlay_text": "Short punchy text for image overlay (5-10 words max)",
+            "hashtags": ["hashtag1", "hashtag2"],
+            "cta": "Call to action",
+            "hook": "Opening sentence or hook",
+            "image_description": "Description of ideal background image",
+            "reasoning": "Brief explanation of this variation's approach"
+        }}
+    ]
+}}
+
+Make the posts engaging, authentic, and truly aligned with the brand voice. Vary the approaches:
+- Variation 1: More direct and action-oriented
+- Variation 2: More storytelling or emotional
+- Variation 3: More data-driven or informative
+
+Return ONLY the JSON, no other text.
+"""
+        
+        return prompt
+    
+    def _get_platform_specs(self, platform):
+        """
+        Get platform-specific specifications
+
+        Args:
+            platform (str): "linkedin" or "instagram"
+
+        Returns:
+            dict: Platform specifications
+        """
+        return _PLATFORM_SPECS.get(platform, _PLATFORM_SPECS["linkedin"])
+    
+    async def refine_with_feedback(self, post_data, user_feedback, brand_profile):
+        """
+        Refine a post based on user feedback
+        
+        Args:
+            post_data (dict): Original post data
+            user_feedback (str): User's feedback or requests
+            brand_profile (dict): Brand profile
+            
+        Returns:
+            dict: Refined post
+        """
+        prompt = f"""
+You are refining a social media post based on user feedback.
+
+ORIGINAL POST:
+{json.dumps(post_data, indent=2)}
+
+BRAND PROFILE:
+{_compact_profile_json(brand_profile)}
+
+USER FEEDBACK:
+{user_feedback}
+
+Generate an improved version that addresses the feedback while maintaining brand alignment.
+
+Return in this JSON format:
+{{
+    "caption": "Updated post text...",
+    "overlay_text": "Updated overlay text",
+    "hashtags": ["hashtag1", "hashtag2"],
+    "cta": "Updated CTA",
+    "hook": "Updated hook",
+    "image_description": "Updated image description",
+    "changes_made": "Summary of what was changed and why"
+}}
+
+Return ONLY the JSON, no other text.
+"""
+        
+        try:
+            async with self._sem:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You are a social media expert. Always respond with valid JSON only."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=2000,
+                    response_format={"type": "json_object"}
+                )
+            
+            response_text = response.choices[0].message.content
+            
+            # JSON mode guarantees a bare JSON body - no fence stripping needed
+            refined_post = json.loads(response_text)
+            
+            # Preserve original metadata
+            refined_post['platform'] = post_data.get('platform')
+            refined_post['intent'] = post_data.get('intent')
+            
+            return refined_post
+            
+        except Exception as e:
+            logger.warning(f"❌ Error refining post: {e}")
             return post_data
\ No newline at end of file
@@ -1,465 +1,786 @@
-"""
-Streamlit Frontend for AI Social Media Agent
-This provides an easy-to-use interface for the entire workflow
-"""
-
-import streamlit as st
-import sys
-import os
-import json
-from datetime import datetime
-
-# Add project root to path
-_project_root = os.path.join(os.path.dirname(__file__), '..')
-sys.path.insert(0, os.path.abspath(_project_root))
-
-from backend.app import SocialMediaAgent
-
-# Page configuration
-st.set_page_config(
-    page_title="AI Social Media Agent",
-    page_icon="🚀",
-    layout="wide"
-)
-
-# Initialize session state
-if 'agent' not in st.session_state:
-    st.session_state.agent = None
-if 'brand_profile' not in st.session_state:
-    st.session_state.brand_profile = None
-if 'generated_posts' not in st.session_state:
-    st.session_state.generated_posts = []
-if 'selected_post' not in st.session_state:
-    st.session_state.selected_post = None
-
-
-def initialize_agent():
-    """Initialize the AI agent with API keys"""
-    try:
-        agent = SocialMediaAgent()
-        st.session_state.agent = agent
-        return True
-    except Exception as e:
-        st.error(f"Failed to initialize agent: {e}")
-        st.info("Make sure you have set OPENAI_API_KEY in your .env file")
-        return False
-
-
-def main():
-    """Main Streamlit application"""
-    
-    # Title and description
-    st.title("🚀 AI Social Media Agent")
-    st.markdown("""
-    Create **brand-aligned** social media posts for LinkedIn & Instagram automatically!
-    
-    This AI agent:
-    - 🎯 Learns your brand voice and visual identity
-    - ✍️ Generates multiple post variations
-    - 🔄 Self-improves through AI feedback loops
-    - 🎨 Creates custom images with text overlays
-    """)
-    
-    st.divider()
-    
-    # Sidebar for API key setup
-    with st.sidebar:
-        st.header("⚙️ Setup")
-        
-        st.markdown("""
-        **Required API Key:**
-        - OpenAI API Key (for GPT-4 + DALL-E)
-        
-        Add this to a `.env` file in the root directory:
-            OPENAI_API_KEY=your_key_here
-            **Get your free API key:**
-        1. Go to https://platform.openai.com/
-        2. Sign up (you get $5 free credits!)
-        3. Go to API Keys section
-        4. Create new key
-        5. Copy and paste into .env file
-        """)
-        
-        if st.button("🔌 Initialize Agent"):
-            with st.spinner("Initializing AI agent..."):
-                if initialize_agent():
-                    st.success("✅ Agent initialized!")
-                else:
-                    st.error("❌ Initialization failed")
-        
-        st.divider()
-        
-        # Quick tips
-        st.markdown("""
-        **💡 Tips:**
-        - Start by analyzing your brand
-        - Generate multiple variations
-        - Refine based on AI feedback
-        - Download your favorites
-        
-        **💰 Cost per post:** ~$0.50
-        **Free credits:** $5 = ~10 complete posts
-        """)
-    
-    # Main content area
-    if st.session_state.agent is None:
-        st.warning("👈 Please initialize the agent using the sidebar")
-        return
-    
-    # Create tabs for different steps
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "1️⃣ Brand Analysis", 
-        "2️⃣ Generate Posts", 
-        "3️⃣ Review & Refine",
-        "4️⃣ Export"
-    ])
-    
-    # TAB 1: Brand Analysis
-    with tab1:
-        st.header("📊 Brand Analysis")
-        st.markdown("Let's understand your brand voice and visual identity")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Input Brand Materials")
-            
-            # Website URL
-            website_url = st.text_input(
-                "Company Website URL",
-                placeholder="https://example.com",
-                help="We'll analyze the content to understand your brand"
-            )
-            
-            # Existing posts
-            st.markdown("**Existing Social Media Posts** (one per line)")
-            existing_posts_text = st.text_area(
-                "Paste 3-5 existing posts",
-                height=200,
-                placeholder="Excited to announce our new product! 🚀\n\nJoin us for our upcoming webinar...\n\n..."
-            )
-            
-            # Parse posts
-            existing_posts = [p.strip() for p in existing_posts_text.split('\n') if p.strip()]
-            
-            # Optional brand guidelines
-            with st.expander("➕ Add Brand Guidelines (Optional)"):
-                brand_tone = st.selectbox(
-                    "Brand Tone",
-                    ["Professional", "Casual", "Playful", "Inspirational", "Technical"]
-                )
-                
-                brand_colors = st.text_input(
-                    "Brand Colors (comma-separated hex codes)",
-                    placeholder="#1a73e8, #34a853"
-                )
-                
-                # Build guidelines dict
-                brand_guidelines = None
-                if brand_colors:
-                    brand_guidelines = {
-                        "tone": brand_tone.lower(),
-                        "colors": [c.strip() for c in brand_colors.split(',')]
-                    }
-        
-        with col2:
-            st.subheader("Brand Profile")
-            
-            if st.button("🔍 Analyze Brand", type="primary", use_container_width=True):
-                if not website_url and not existing_posts:
-                    st.error("Please provide at least a website URL or existing posts")
-                else:
-                    with st.spinner("Analyzing your brand... This may take 30-60 seconds"):
-                        brand_profile = st.session_state.agent.analyze_brand(
-                            website_url=website_url if website_url else None,
-                            existing_posts=existing_posts if existing_posts else None,
-                            brand_guidelines=brand_guidelines
-                        )
-                        st.session_state.brand_profile = brand_profile
-                        st.success("✅ Brand analysis complete!")
-            
-            # Display brand profile if available
-            if st.session_state.brand_profile:
-                st.json(st.session_state.brand_profile, expanded=False)
-                
-                # Show key insights
-                st.markdown("**Key Insights:**")
-                profile = st.session_state.brand_profile
-                st.write(f"- **Tone:** {profile['brand_voice']['tone']}")
-                st.write(f"- **Emoji Usage:** {profile['brand_voice']['emoji_usage']}")
-                st.write(f"- **Design Style:** {profile['visual_identity']['design_style']}")
-                st.write(f"- **Key Themes:** {', '.join(profile['messaging_patterns']['key_themes'][:3])}")
-    
-    # TAB 2: Generate Posts
-    with tab2:
-        st.header("✍️ Generate Social Media Posts")
-        
-        if not st.session_state.brand_profile:
-            st.warning("⚠️ Please analyze your brand first (Tab 1)")
-            return
-        
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.subheader("Post Configuration")
-            
-            # Post intent
-            intent = st.text_input(
-                "What is this post about?",
-                placeholder="Announce our AI hackathon with Super Bowl theme",
-                help="Be specific about what you want to communicate"
-            )
-            
-            # Platform selection
-            platform = st.selectbox(
-                "Platform",
-                ["linkedin", "instagram"],
-                format_func=lambda x: x.capitalize()
-            )
-            
-            # Optional constraints
-            with st.expander("⚙️ Additional Constraints (Optional)"):
-                tone_override = st.selectbox(
-                    "Tone Override",
-                    ["Use Brand Default", "More Formal", "More Casual", "More Exciting", "More Urgent"]
-                )
-                
-                cta_text = st.text_input(
-                    "Specific CTA",
-                    placeholder="Register now",
-                    help="Leave empty to use brand defaults"
-                )
-                
-                post_date = st.date_input("Post Date (Optional)")
-                
-                # Build constraints
-                constraints = {}
-                if tone_override != "Use Brand Default":
-                    constraints['tone'] = tone_override.lower().replace("more ", "")
-                if cta_text:
-                    constraints['cta'] = cta_text
-                if post_date:
-                    constraints['date'] = str(post_date)
-            
-            # RAG elements (e.g., speaker names, prizes)
-            with st.expander("📎 Elements to Include (Optional)"):
-                st.markdown("Add specific information to include in the post")
-                
-                speakers = st.text_input("Speaker Names", placeholder="John Doe, Jane Smith")
-                prizes = st.text_input("Prize Information", placeholder="$10,000 grand prize")
-                event_details = st.text_area("Event Details", placeholder="Date, time, location...")
-                
-                # Build RAG elements
-                rag_elements = {}
-                if speakers:
-                    rag_elements['speakers'] = speakers
-                if prizes:
-                    rag_elements['prizes'] = prizes
-                if event_details:
-                    rag_elements['event_details'] = event_details
-        
-        with col2:
-            st.subheader("Generated Variations")
-            
-            if st.button("🎨 Generate Posts", type="primary", use_container_width=True):
-                if not intent:
-                    st.error("Please provide a post intent")
-                else:
-                    with st.spinner("Generating 3 post variations... This may take 2-3 minutes"):
-                        try:
-                            posts = st.session_state.agent.generate_post(
-                                intent=intent,
-                                platform=platform,
-                                constraints=constraints if constraints else None,
-                                rag_elements=rag_elements if rag_elements else None
-                            )
-                            st.session_state.generated_posts = posts
-                            st.success(f"✅ Generated {len(posts)} variations!")
-                        except Exception as e:
-                            st.error(f"Error generating posts: {e}")
-                            st.info("Check your OpenAI API key and credits")
-            
-            # Display generated posts
-            if st.session_state.generated_posts:
-                st.markdown(f"**{len(st.session_state.generated_posts)} variations generated**")
-                
-                for idx, post in enumerate(st.session_state.generated_posts):
-                    with st.expander(f"📄 Variation {idx + 1} (Score: {post.get('critique_score', 'N/A')}/10)"):
-                        st.markdown("**Caption:**")
-                        st.write(post['caption'])
-                        
-                        st.markdown("**Overlay Text:**")
-                        st.code(post.get('overlay_text', ''))
-                        
-                        st.markdown("**Hashtags:**")
-                        st.write(' '.join([f"#{tag}" for tag in post.get('hashtags', [])]))
-                        
-                        # Show image if available
-                        if 'image_path' in post and os.path.exists(post['image_path']):
-                            st.image(post['image_path'], use_container_width=True)
-                        
-                        # Select button
-                        if st.button(f"✅ Select Variation {idx + 1}", key=f"select_{idx}"):
-                            st.session_state.selected_post = post
-                            st.success(f"Selected Variation {idx + 1}!")
-    
-    # TAB 3: Review & Refine
-    with tab3:
-        st.header("🔧 Review & Refine")
-        
-        if not st.session_state.selected_post:
-            st.info("👈 Generate and select a post variation from Tab 2")
-            return
-        
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.subheader("Current Post")
-            
-            post = st.session_state.selected_post
-            
-            st.markdown("**Caption:**")
-            st.write(post['caption'])
-            
-            st.markdown("**Overlay Text:**")
-            st.code(post.get('overlay_text', ''))
-            
-            st.markdown("**Hashtags:**")
-            st.write(' '.join([f"#{tag}" for tag in post.get('hashtags', [])]))
-            
-            # Show image
-            if 'image_path' in post and os.path.exists(post['image_path']):
-                st.image(post['image_path'], use_container_width=True)
-        
-        with col2:
-            st.subheader("Refinement")
-            
-            st.markdown("**Provide feedback to improve this post:**")
-            
-            user_feedback = st.text_area(
-                "What would you like to change?",
-                placeholder="Make it more exciting\nAdd a stronger CTA\nShorten the caption\nChange the tone to be more professional",
-                height=150
-            )
-            
-            if st.button("🔄 Refine Post", type="primary", use_container_width=True):
-                if not user_feedback:
-                    st.error("Please provide feedback")
-                else:
-                    with st.spinner("Refining post based on your feedback..."):
-                        try:
-                            refined_post = st.session_state.agent.refine_post(
-                                post_data=post,
-                                user_feedback=user_feedback
-                            )
-                            st.session_state.selected_post = refined_post
-                            st.success("✅ Post refined!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error refining post: {e}")
-            
-            # Quick action buttons
-            st.markdown("**Quick Actions:**")
-            col_a, col_b = st.columns(2)
-            
-            with col_a:
-                if st.button("📝 Shorten", use_container_width=True):
-                    with st.spinner("Shortening..."):
-                        try:
-                            refined = st.session_state.agent.refine_post(
-                                post, "Make the caption shorter and more concise"
-                            )
-                            st.session_state.selected_post = refined
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error: {e}")
-            
-            with col_b:
-                if st.button("🎯 Stronger CTA", use_container_width=True):
-                    with st.spinner("Improving CTA..."):
-                        try:
-                            refined = st.session_state.agent.refine_post(
-                                post, "Make the call-to-action more compelling and urgent"
-                            )
-                            st.session_state.selected_post = refined
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error: {e}")
-    
-    # TAB 4: Export
-    with tab4:
-        st.header("💾 Export Your Posts")
-        
-        if not st.session_state.selected_post:
-            st.info("Select a post from Tab 3 to export")
-            return
-        
-        post = st.session_state.selected_post
-        
-        col1, col2 = st.columns([2, 1])
-        
-        with col1:
-            st.subheader("Final Post Preview")
-            
-            st.markdown("**Caption:**")
-            caption_text = post['caption']
-            st.text_area("Copy Caption", caption_text, height=200, key="export_caption")
-            
-            st.markdown("**Hashtags:**")
-            hashtags_text = ' '.join([f"#{tag}" for tag in post.get('hashtags', [])])
-            st.text_input("Copy Hashtags", hashtags_text, key="export_hashtags")
-            
-            # Show final image
-            if 'image_path' in post and os.path.exists(post['image_path']):
-                st.image(post['image_path'], use_container_width=True)
-                
-                # Download image button
-                with open(post['image_path'], 'rb') as f:
-                    st.download_button(
-                        label="📥 Download Image",
-                        data=f,
-                        file_name=f"social_post_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                        mime="image/png",
-                        use_container_width=True
-                    )
-        
-        with col2:
-            st.subheader("Actions")
-            
-            # Save to disk
-            if st.button("💾 Save to Disk", use_container_width=True):
-                output_dir = st.session_state.agent.save_post(post)
-                st.success(f"✅ Saved to {output_dir}")
-            
-            # Export as JSON
-            if st.button("📄 Export as JSON", use_container_width=True):
-                json_data = json.dumps(post, indent=2, default=str)
-                st.download_button(
-                    label="Download JSON",
-                    data=json_data,
-                    file_name=f"post_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
-            
-            st.divider()
-            
-            # Post metadata
-            st.markdown("**Post Metadata:**")
-            st.write(f"Platform: {post.get('platform', 'N/A').capitalize()}")
-            st.write(f"Intent: {post.get('intent', 'N/A')}")
-            if 'critique_score' in post:
-                st.write(f"Quality Score: {post['critique_score']}/10")
-            
-            st.divider()
-            
-            # Start over
-            if st.button("🔄 Generate New Post", use_container_width=True):
-                st.session_state.generated_posts = []
-                st.session_state.selected_post = None
-                st.success("Ready for a new post!")
-                st.rerun()
-
-
-if __name__ == "__main__":
+"""
+Streamlit Frontend for AI Social Media Agent
+This provides an easy-to-use interface for the entire workflow
+"""
+
+import streamlit as st
+import hashlib
+import sys
+import os
+import json
+import time
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+# Add project root to path
+_project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(_project_root))
+
+# backend.app (and openai, PIL, bs4, requests behind it) is imported lazily
+# inside _get_agent so the first page paints before any of it loads
+
+# Page configuration
+st.set_page_config(
+    page_title="AI Social Media Agent",
+    page_icon="🚀",
+    layout="wide"
+)
+
+# Initialize session state
+if 'agent' not in st.session_state:
+    st.session_state.agent = None
+if 'brand_profile' not in st.session_state:
+    st.session_state.brand_profile = None
+if 'generated_posts' not in st.session_state:
+    st.session_state.generated_posts = []
+if 'selected_post' not in st.session_state:
+    st.session_state.selected_post = None
+
+
+@lru_cache(maxsize=256)
+def _path_exists(path, mtime_bucket):
+    """
+    os.path.exists memoized in 5-second buckets
+
+    Every rerun stats each displayed image path across three tabs. The
+    bucket argument rotates the cache key every 5s so freshly written
+    images still appear promptly without a stat per widget interaction.
+    """
+    return os.path.exists(path)
+
+
+def _image_exists(post):
+    """Whether a post's image file exists, via the bucketed stat cache"""
+    return 'image_path' in post and _path_exists(post['image_path'], int(time.time()) // 5)
+
+
+@st.cache_data(show_spinner=False)
+def _post_json(post):
+    """
+    Export JSON for a post, memoized on its content
+
+    Cached via st.cache_data rather than stashed on the dict: stashing
+    leaked the rendered JSON into refine prompts, refine cache keys and
+    persisted session files. Underscore keys (from sessions saved by
+    older builds) are excluded from the export.
+    """
+    clean = {k: v for k, v in post.items() if not k.startswith('_')}
+    return json.dumps(clean, indent=2, default=str)
+
+
+@st.cache_data(show_spinner=False)
+def _join_hashtags(hashtags):
+    """Render a hashtag tuple for display, memoized on the tags"""
+    return ' '.join(f"#{tag}" for tag in hashtags)
+
+
+def _hashtags_str(post):
+    """
+    Hashtag display string for a post
+
+    Keyed on the tag tuple itself (not stashed on the post dict, which
+    would leak a display-only key into refines and persisted sessions).
+    """
+    return _join_hashtags(tuple(post.get('hashtags') or ()))
+
+
+@st.cache_resource
+def _openai_client():
+    """
+    One pooled sync OpenAI client per server process
+
+    Kept as its own cached resource (rather than only inside the agent)
+    so the keep-alive pool survives even if the agent cache is cleared or
+    rebuilt - each TLS handshake saved is ~100-300ms per request. Only the
+    sync client is cached here: an AsyncOpenAI client's pooled connections
+    are bound to the event loop that opened them, so the async client has
+    to live and die with the agent (and its loop), not outlast it.
+    """
+    import httpx
+    import openai
+    limits = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    return openai.OpenAI(http_client=httpx.Client(limits=limits))
+
+
+@st.cache_resource
+def _get_agent():
+    """
+    Build the SocialMediaAgent once per server process
+
+    The agent owns network clients and connection pools - exactly the kind
+    of unserializable resource st.cache_resource is for. Caching it here
+    means reruns, repeat "Initialize Agent" clicks and other browser
+    sessions all share one agent instead of paying construction (and
+    holding duplicate connection pools) each time.
+    """
+    from backend.app import SocialMediaAgent
+    return SocialMediaAgent(client=_openai_client())
+
+
+@st.cache_data(show_spinner=False)
+def _parse_posts(text):
+    """One post per non-blank line; cached since reruns repeat the same text"""
+    return [p for p in map(str.strip, text.splitlines()) if p]
+
+
+@st.cache_data(show_spinner=False)
+def _parse_colors(text):
+    """Comma-separated hex codes to a list, cached on the raw text"""
+    return [c.strip() for c in text.split(',') if c.strip()]
+
+
+@st.cache_data(show_spinner=False)
+def _load_bytes(path, mtime):
+    """
+    Image bytes cached in memory, keyed on (path, mtime)
+
+    The export tab re-read the whole PNG from disk on every rerun just to
+    feed the download button. The mtime key invalidates automatically if
+    the file is regenerated in place.
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@st.cache_data(show_spinner=False)
+def _profile_display_json(profile):
+    """
+    Brand profile pretty-printed for display, serialized once
+
+    st.json re-serialized the whole nested profile on every rerun of
+    tab 1; orjson (C-implemented) does the formatting several times
+    faster, and the cache makes repeat reruns a lookup.
+    """
+    import orjson
+    return orjson.dumps(profile, option=orjson.OPT_INDENT_2).decode()
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def _cached_analyze_brand(website_url, existing_posts, guidelines_json):
+    """
+    Brand analysis memoized on its inputs
+
+    A repeat click with the same URL/posts/guidelines re-ran the whole
+    30-60s scrape + GPT pipeline; with identical inputs the profile is the
+    same, so serve it from cache instead. Arguments are hashable forms
+    (posts as a tuple, guidelines as sorted JSON) so Streamlit can key on
+    them; the TTL bounds staleness for sites that change.
+    """
+    guidelines = json.loads(guidelines_json) if guidelines_json else None
+    return _get_agent().analyze_brand(
+        website_url=website_url or None,
+        existing_posts=list(existing_posts) or None,
+        brand_guidelines=guidelines
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _cached_refine(post_json, user_feedback, profile_json):
+    """
+    Post refinement memoized on (post, feedback, profile)
+
+    Clicking the same quick-action twice on the same post is common; the
+    second click would re-pay the full LLM refinement for an identical
+    request. The arguments arrive as sorted JSON so they hash stably; the
+    profile is passed through to refine_post rather than stamped on the
+    shared agent, so concurrent sessions can't swap brands mid-refine.
+    """
+    return _get_agent().refine_post(
+        post_data=json.loads(post_json),
+        user_feedback=user_feedback,
+        brand_profile=json.loads(profile_json)
+    )
+
+
+def _refine(post, user_feedback):
+    """
+    Refine a post through the memoized wrapper
+
+    Underscore-prefixed keys are display-only artifacts (sessions saved by
+    older builds stashed rendered JSON on the post); dropping them keeps
+    the refine prompt and the cache key down to the real post content.
+    """
+    clean = {k: v for k, v in post.items() if not k.startswith('_')}
+    return _cached_refine(
+        json.dumps(clean, sort_keys=True, default=str),
+        user_feedback,
+        json.dumps(st.session_state.brand_profile, sort_keys=True, default=str)
+    )
+
+
+@st.fragment
+def _refine_fragment():
+    """
+    Review & Refine tab body, scoped as a fragment
+
+    Refine buttons used to call st.rerun(), re-executing the whole script -
+    sidebar, all four tabs and their widgets - per click. As a fragment,
+    a button click reruns only this block; the other tabs pick up the
+    updated selection on the next natural full rerun.
+    """
+    st.header("🔧 Review & Refine")
+
+    if not st.session_state.selected_post:
+        st.info("👈 Generate and select a post variation from Tab 2")
+        return
+
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.subheader("Current Post")
+
+        post = st.session_state.selected_post
+
+        st.markdown("**Caption:**")
+        st.write(post['caption'])
+
+        st.markdown("**Overlay Text:**")
+        st.code(post.get('overlay_text', ''))
+
+        st.markdown("**Hashtags:**")
+        st.write(_hashtags_str(post))
+
+        # Show image
+        if _image_exists(post):
+            st.image(post['image_path'], use_container_width=True)
+
+    with col2:
+        st.subheader("Refinement")
+
+        st.markdown("**Provide feedback to improve this post:**")
+
+        user_feedback = st.text_area(
+            "What would you like to change?",
+            placeholder="Make it more exciting\nAdd a stronger CTA\nShorten the caption\nChange the tone to be more professional",
+            height=150
+        )
+
+        if st.button("🔄 Refine Post", type="primary", use_container_width=True):
+            if not user_feedback:
+                st.error("Please provide feedback")
+            else:
+                with st.spinner("Refining post based on your feedback..."):
+                    try:
+                        refined_post = _refine(post, user_feedback)
+                        st.session_state.selected_post = refined_post
+                        _persist_session()
+                        st.success("✅ Post refined!")
+                    except Exception as e:
+                        st.error(f"Error refining post: {e}")
+
+        # Quick action buttons
+        st.markdown("**Quick Actions:**")
+        col_a, col_b = st.columns(2)
+
+        with col_a:
+            if st.button("📝 Shorten", use_container_width=True):
+                with st.spinner("Shortening..."):
+                    try:
+                        refined = _refine(
+                            post, "Make the caption shorter and more concise"
+                        )
+                        st.session_state.selected_post = refined
+                        _persist_session()
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+        with col_b:
+            if st.button("🎯 Stronger CTA", use_container_width=True):
+                with st.spinner("Improving CTA..."):
+                    try:
+                        refined = _refine(
+                            post, "Make the call-to-action more compelling and urgent"
+                        )
+                        st.session_state.selected_post = refined
+                        _persist_session()
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+
+_SESSIONS_DIR = Path("data/sessions")
+
+
+@st.cache_resource
+def _process_started_at():
+    """
+    When this server process first ran the script
+
+    Session files written after this moment belong to other live sessions,
+    not to a pre-restart incarnation of this one. Kept behind
+    st.cache_resource because Streamlit re-executes the whole script on
+    every rerun - a module-level time.time() would record the current
+    rerun's start and make the restore guard treat other live sessions'
+    files as pre-restart leftovers.
+    """
+    return time.time()
+
+
+# Pin the timestamp on the first script run, before any session has had a
+# chance to persist anything in this process
+_process_started_at()
+
+
+def _sid():
+    """Streamlit session id, or "default" outside a script run"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "default"
+    except Exception:
+        return "default"
+
+
+def _persist_session():
+    """
+    Mirror the expensive session state to disk
+
+    generated_posts and selected_post each cost real money and minutes of
+    LLM time; session_state alone loses them on any server restart. Every
+    write to either also lands in data/sessions/{session_id}.json so they
+    can be rehydrated for the price of one json.loads.
+    """
+    def _clean(post):
+        # Scrub display-only underscore keys left by older builds before
+        # they get persisted (and later fed back into refine prompts)
+        if isinstance(post, dict):
+            return {k: v for k, v in post.items() if not k.startswith('_')}
+        return post
+
+    _SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    (_SESSIONS_DIR / f"{_sid()}.json").write_text(json.dumps({
+        'generated_posts': [_clean(p) for p in st.session_state.generated_posts],
+        'selected_post': _clean(st.session_state.selected_post),
+    }, default=str))
+
+
+def _restore_session():
+    """
+    Rehydrate posts from disk after a restart
+
+    A restarted server hands the browser a fresh session id, so if this
+    session has no file yet, fall back to a file written before this
+    process started - anything newer belongs to another live session on
+    the same server. The fallback only fires when exactly one pre-restart
+    file exists: with several there is no way to tell whose is whose, and
+    guessing by recency would hand this user somebody else's posts. The
+    claimed file is renamed to this session's id so a second session can't
+    restore it too.
+    """
+    path = _SESSIONS_DIR / f"{_sid()}.json"
+    if not path.exists():
+        candidates = [
+            p for p in _SESSIONS_DIR.glob("*.json")
+            if p.stat().st_mtime < _process_started_at()
+        ] if _SESSIONS_DIR.exists() else []
+        if len(candidates) != 1:
+            return
+        try:
+            candidates[0].replace(path)
+        except OSError:
+            return
+    try:
+        saved = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return
+    st.session_state.generated_posts = saved.get('generated_posts', [])
+    st.session_state.selected_post = saved.get('selected_post')
+
+
+def initialize_agent():
+    """Initialize the AI agent with API keys"""
+    try:
+        st.session_state.agent = _get_agent()
+        # Bring back posts generated before the last server restart
+        if not st.session_state.generated_posts and not st.session_state.selected_post:
+            _restore_session()
+        return True
+    except Exception as e:
+        st.error(f"Failed to initialize agent: {e}")
+        st.info("Make sure you have set OPENAI_API_KEY in your .env file")
+        return False
+
+
+def main():
+    """Main Streamlit application"""
+    
+    # Title and description
+    st.title("🚀 AI Social Media Agent")
+    st.markdown("""
+    Create **brand-aligned** social media posts for LinkedIn & Instagram automatically!
+    
+    This AI agent:
+    - 🎯 Learns your brand voice and visual identity
+    - ✍️ Generates multiple post variations
+    - 🔄 Self-improves through AI feedback loops
+    - 🎨 Creates custom images with text overlays
+    """)
+    
+    st.divider()
+    
+    # Sidebar for API key setup
+    with st.sidebar:
+        st.header("⚙️ Setup")
+        
+        st.markdown("""
+        **Required API Key:**
+        - OpenAI API Key (for GPT-4 + DALL-E)
+        
+        Add this to a `.env` file in the root directory:
+            OPENAI_API_KEY=your_key_here
+            **Get your free API key:**
+        1. Go to https://platform.openai.com/
+        2. Sign up (you get $5 free credits!)
+        3. Go to API Keys section
+        4. Create new key
+        5. Copy and paste into .env file
+        """)
+        
+        if st.button("🔌 Initialize Agent"):
+            with st.spinner("Initializing AI agent..."):
+                if initialize_agent():
+                    st.success("✅ Agent initialized!")
+                else:
+                    st.error("❌ Initialization failed")
+        
+        st.divider()
+
+        # DALL-E 3 dominates per-post cost; economy mode swaps in DALL-E 2
+        # for draft-quality backgrounds at a fraction of the price
+        economy_mode = st.checkbox(
+            "💰 Economy mode (cheaper draft images)",
+            help="Render backgrounds with DALL-E 2: much cheaper and faster, "
+                 "but square and lower fidelity. Good for drafts."
+        )
+
+        st.divider()
+
+        # Quick tips
+        st.markdown("""
+        **💡 Tips:**
+        - Start by analyzing your brand
+        - Generate multiple variations
+        - Refine based on AI feedback
+        - Download your favorites
+        
+        **💰 Cost per post:** ~$0.50
+        **Free credits:** $5 = ~10 complete posts
+        """)
+    
+    # Main content area
+    if st.session_state.agent is None:
+        st.warning("👈 Please initialize the agent using the sidebar")
+        return
+    
+    # Create tabs for different steps
+    tab1, tab2, tab3, tab4 = st.tabs([
+        "1️⃣ Brand Analysis", 
+        "2️⃣ Generate Posts", 
+        "3️⃣ Review & Refine",
+        "4️⃣ Export"
+    ])
+    
+    # TAB 1: Brand Analysis
+    with tab1:
+        st.header("📊 Brand Analysis")
+        st.markdown("Let's understand your brand voice and visual identity")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("Input Brand Materials")
+            
+            # Website URL
+            website_url = st.text_input(
+                "Company Website URL",
+                placeholder="https://example.com",
+                help="We'll analyze the content to understand your brand"
+            )
+            
+            # Existing posts
+            st.markdown("**Existing Social Media Posts** (one per line)")
+            existing_posts_text = st.text_area(
+                "Paste 3-5 existing posts",
+                height=200,
+                placeholder="Excited to announce our new product! 🚀\n\nJoin us for our upcoming webinar...\n\n..."
+            )
+            
+            # Parse posts
+            existing_posts = _parse_posts(existing_posts_text)
+            
+            # Optional brand guidelines
+            with st.expander("➕ Add Brand Guidelines (Optional)"):
+                brand_tone = st.selectbox(
+                    "Brand Tone",
+                    ["Professional", "Casual", "Playful", "Inspirational", "Technical"]
+                )
+                
+                brand_colors = st.text_input(
+                    "Brand Colors (comma-separated hex codes)",
+                    placeholder="#1a73e8, #34a853"
+                )
+                
+                # Build guidelines dict
+                brand_guidelines = None
+                if brand_colors:
+                    brand_guidelines = {
+                        "tone": brand_tone.lower(),
+                        "colors": _parse_colors(brand_colors)
+                    }
+        
+        with col2:
+            st.subheader("Brand Profile")
+            
+            if st.button("🔍 Analyze Brand", type="primary", use_container_width=True):
+                if not website_url and not existing_posts:
+                    st.error("Please provide at least a website URL or existing posts")
+                else:
+                    with st.spinner("Analyzing your brand... This may take 30-60 seconds"):
+                        brand_profile = _cached_analyze_brand(
+                            website_url,
+                            tuple(existing_posts),
+                            json.dumps(brand_guidelines, sort_keys=True) if brand_guidelines else ""
+                        )
+                        st.session_state.brand_profile = brand_profile
+                        st.success("✅ Brand analysis complete!")
+            
+            # Display brand profile if available
+            if st.session_state.brand_profile:
+                with st.expander("Full profile JSON"):
+                    st.code(_profile_display_json(st.session_state.brand_profile),
+                            language="json")
+                
+                # Show key insights
+                st.markdown("**Key Insights:**")
+                profile = st.session_state.brand_profile
+                st.write(f"- **Tone:** {profile['brand_voice']['tone']}")
+                st.write(f"- **Emoji Usage:** {profile['brand_voice']['emoji_usage']}")
+                st.write(f"- **Design Style:** {profile['visual_identity']['design_style']}")
+                st.write(f"- **Key Themes:** {', '.join(profile['messaging_patterns']['key_themes'][:3])}")
+    
+    # TAB 2: Generate Posts
+    with tab2:
+        st.header("✍️ Generate Social Media Posts")
+        
+        if not st.session_state.brand_profile:
+            st.warning("⚠️ Please analyze your brand first (Tab 1)")
+            return
+        
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            st.subheader("Post Configuration")
+            
+            # Post intent
+            intent = st.text_input(
+                "What is this post about?",
+                placeholder="Announce our AI hackathon with Super Bowl theme",
+                help="Be specific about what you want to communicate"
+            )
+            
+            # Platform selection
+            platform = st.selectbox(
+                "Platform",
+                ["linkedin", "instagram"],
+                format_func=lambda x: x.capitalize()
+            )
+            
+            # Optional constraints
+            with st.expander("⚙️ Additional Constraints (Optional)"):
+                tone_override = st.selectbox(
+                    "Tone Override",
+                    ["Use Brand Default", "More Formal", "More Casual", "More Exciting", "More Urgent"]
+                )
+                
+                cta_text = st.text_input(
+                    "Specific CTA",
+                    placeholder="Register now",
+                    help="Leave empty to use brand defaults"
+                )
+                
+                post_date = st.date_input("Post Date (Optional)")
+                
+                # Build constraints
+                constraints = {}
+                if tone_override != "Use Brand Default":
+                    constraints['tone'] = tone_override.lower().replace("more ", "")
+                if cta_text:
+                    constraints['cta'] = cta_text
+                if post_date:
+                    constraints['date'] = str(post_date)
+            
+            # RAG elements (e.g., speaker names, prizes)
+            with st.expander("📎 Elements to Include (Optional)"):
+                st.markdown("Add specific information to include in the post")
+                
+                speakers = st.text_input("Speaker Names", placeholder="John Doe, Jane Smith")
+                prizes = st.text_input("Prize Information", placeholder="$10,000 grand prize")
+                event_details = st.text_area("Event Details", placeholder="Date, time, location...")
+                
+                # Build RAG elements
+                rag_elements = {}
+                if speakers:
+                    rag_elements['speakers'] = speakers
+                if prizes:
+                    rag_elements['prizes'] = prizes
+                if event_details:
+                    rag_elements['event_details'] = event_details
+        
+        with col2:
+            st.subheader("Generated Variations")
+            
+            if st.button("🎨 Generate Posts", type="primary", use_container_width=True):
+                if not intent:
+                    st.error("Please provide a post intent")
+                else:
+                    with st.spinner("Generating 3 post variations in parallel... This may take about a minute"):
+                        # Streamed previews: each variation appears in its
+                        # placeholder the moment it finishes, instead of
+                        # everything waiting on the slowest render
+                        placeholders = [st.empty() for _ in range(3)]
+
+                        def _show_preview(idx, post):
+                            with placeholders[idx].container():
+                                st.markdown(f"**Variation {idx + 1} ready** "
+                                            f"(Score: {post.get('critique_score', 'N/A')}/10)")
+                                st.write(post['caption'])
+                                if _image_exists(post):
+                                    st.image(post['image_path'], use_container_width=True)
+
+                        try:
+                            # The agent is shared across browser sessions;
+                            # the profile goes in as an argument so another
+                            # session can't swap it out mid-generation
+                            posts = st.session_state.agent.generate_post(
+                                intent=intent,
+                                platform=platform,
+                                constraints=constraints if constraints else None,
+                                rag_elements=rag_elements if rag_elements else None,
+                                economy_mode=economy_mode,
+                                on_variation=_show_preview,
+                                brand_profile=st.session_state.brand_profile
+                            )
+                            st.session_state.generated_posts = posts
+                            _persist_session()
+                            # The full expander list below replaces the previews
+                            for placeholder in placeholders:
+                                placeholder.empty()
+                            st.success(f"✅ Generated {len(posts)} variations!")
+                        except Exception as e:
+                            st.error(f"Error generating posts: {e}")
+                            st.info("Check your OpenAI API key and credits")
+            
+            # Display generated posts
+            if st.session_state.generated_posts:
+                st.markdown(f"**{len(st.session_state.generated_posts)} variations generated**")
+                
+                for idx, post in enumerate(st.session_state.generated_posts):
+                    with st.expander(f"📄 Variation {idx + 1} (Score: {post.get('critique_score', 'N/A')}/10)"):
+                        st.markdown("**Caption:**")
+                        st.write(post['caption'])
+                        
+                        st.markdown("**Overlay Text:**")
+                        st.code(post.get('overlay_text', ''))
+                        
+                        st.markdown("**Hashtags:**")
+                        st.write(_hashtags_str(post))
+                        
+                        # Show image if available
+                        if _image_exists(post):
+                            st.image(post['image_path'], use_container_width=True)
+                        
+                        # Select button
+                        if st.button(f"✅ Select Variation {idx + 1}", key=f"select_{idx}"):
+                            st.session_state.selected_post = post
+                            _persist_session()
+                            st.success(f"Selected Variation {idx + 1}!")
+    
+    # TAB 3: Review & Refine
+    with tab3:
+        _refine_fragment()
+    
+    # TAB 4: Export
+    with tab4:
+        st.header("💾 Export Your Posts")
+        
+        if not st.session_state.selected_post:
+            st.info("Select a post from Tab 3 to export")
+            return
+        
+        post = st.session_state.selected_post
+        
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            st.subheader("Final Post Preview")
+            
+            st.markdown("**Caption:**")
+            caption_text = post['caption']
+            st.text_area("Copy Caption", caption_text, height=200, key="export_caption")
+            
+            st.markdown("**Hashtags:**")
+            hashtags_text = _hashtags_str(post)
+            st.text_input("Copy Hashtags", hashtags_text, key="export_hashtags")
+            
+            # Show final image
+            if _image_exists(post):
+                st.image(post['image_path'], use_container_width=True)
+                
+                # Download image button - bytes served from the in-memory
+                # cache instead of re-reading the PNG on every rerun
+                image_bytes = _load_bytes(
+                    post['image_path'], os.path.getmtime(post['image_path'])
+                )
+                # Content-hashed name: identical content keeps the same
+                # filename across downloads, so proxies and browsers can
+                # cache it forever (see the deployment notes in the README)
+                content_key = hashlib.sha1(image_bytes).hexdigest()[:8]
+                st.download_button(
+                    label="📥 Download Image",
+                    data=image_bytes,
+                    file_name=f"social_post_{content_key}.png",
+                    mime="image/png",
+                    use_container_width=True
+                )
+        
+        with col2:
+            st.subheader("Actions")
+            
+            # Save to disk
+            if st.button("💾 Save to Disk", use_container_width=True):
+                output_dir = st.session_state.agent.save_post(post)
+                st.success(f"✅ Saved to {output_dir}")
+            
+            # Export as JSON - memoized per post via _post_json, and
+            # offered directly (the old button-inside-button flow made the
+            # download link vanish on the next rerun)
+            st.download_button(
+                label="📄 Export as JSON",
+                data=_post_json(post),
+                file_name=f"post_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+            
+            st.divider()
+            
+            # Post metadata
+            st.markdown("**Post Metadata:**")
+            st.write(f"Platform: {post.get('platform', 'N/A').capitalize()}")
+            st.write(f"Intent: {post.get('intent', 'N/A')}")
+            if 'critique_score' in post:
+                st.write(f"Quality Score: {post['critique_score']}/10")
+            
+            st.divider()
+            
+            # Start over
+            if st.button("🔄 Generate New Post", use_container_width=True):
+                st.session_state.generated_posts = []
+                st.session_state.selected_post = None
+                _persist_session()
+                st.success("Ready for a new post!")
+                st.rerun()
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file